@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.shortcuts import reverse
 from django.templatetags.static import static
 from django.utils.html import format_html
@@ -10,6 +10,9 @@ from .models import Restaurant
 from .models import RestaurantMenuItem
 from .models import OrderProduct
 from .models import Order
+from .models import OrderEvent
+from .menu import set_menu_availability
+from .transitions import InvalidTransition, transition_order
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -17,6 +20,16 @@ class RestaurantMenuItemInline(admin.TabularInline):
     extra = 0
 
 
+def make_menu_availability_action(field, available, description):
+    def set_availability(modeladmin, request, queryset):
+        menu_items = RestaurantMenuItem.objects.filter(**{f'{field}__in': queryset.values('pk')})
+        updated = set_menu_availability([menu_items], available)
+        modeladmin.message_user(request, f'{description}: изменено {updated} пунктов меню')
+
+    set_availability.__name__ = f'set_{field}_availability_{str(available).lower()}'
+    return admin.action(description=description)(set_availability)
+
+
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
     search_fields = [
@@ -32,6 +45,10 @@ class RestaurantAdmin(admin.ModelAdmin):
     inlines = [
         RestaurantMenuItemInline
     ]
+    actions = [
+        make_menu_availability_action('restaurant', False, 'Снять всё меню с продажи'),
+        make_menu_availability_action('restaurant', True, 'Вернуть всё меню в продажу'),
+    ]
 
 
 @admin.register(Product)
@@ -52,16 +69,22 @@ class ProductAdmin(admin.ModelAdmin):
         # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
         # Migration to PostgreSQL is necessary
         'name',
+        'code',
         'category__name',
     ]
 
     inlines = [
         RestaurantMenuItemInline
     ]
+    actions = [
+        make_menu_availability_action('product', False, 'Снять с продажи во всех ресторанах'),
+        make_menu_availability_action('product', True, 'Вернуть в продажу во всех ресторанах'),
+    ]
     fieldsets = (
         ('Общее', {
             'fields': [
                 'name',
+                'code',
                 'category',
                 'image',
                 'get_image_preview',
@@ -113,6 +136,33 @@ class OrderProductInline(admin.TabularInline):
     model = OrderProduct
 
 
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    fields = ['created_at', 'from_status', 'to_status', 'restaurant']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+def make_transition_action(status, description):
+    def transition_orders(modeladmin, request, queryset):
+        moved = 0
+        for order_id in queryset.values_list('id', flat=True):
+            try:
+                transition_order(order_id, status)
+                moved += 1
+            except InvalidTransition as error:
+                modeladmin.message_user(request, str(error), messages.WARNING)
+        if moved:
+            modeladmin.message_user(request, f'{description}: {moved} заказов')
+
+    transition_orders.__name__ = f'transition_to_{status.lower()}'
+    return admin.action(description=description)(transition_orders)
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     search_fields = [
@@ -124,10 +174,22 @@ class OrderAdmin(admin.ModelAdmin):
     ]
     inlines = [
         OrderProductInline,
+        OrderEventInline,
+    ]
+    readonly_fields = [
+        'total_cost',
+        'status',
+        'called_at',
+        'delivered_at',
+    ]
+    actions = [
+        make_transition_action('CK', 'Передать в ресторан'),
+        make_transition_action('DL', 'Передать курьеру'),
+        make_transition_action('CP', 'Завершить'),
     ]
 
     def response_change(self, request, obj):
-        res = super().response_change()
+        res = super().response_change(request, obj)
         if "next" in request.GET:
             return HttpResponseRedirect(request.GET['next'])
         else:
@@ -137,3 +199,18 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderProduct)
 class OrderProductAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OrderEvent)
+class OrderEventAdmin(admin.ModelAdmin):
+    list_display = ['order', 'from_status', 'to_status', 'restaurant', 'created_at']
+    list_filter = ['to_status', 'restaurant']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
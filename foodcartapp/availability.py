@@ -0,0 +1,89 @@
+import numpy as np
+
+from .cache_versions import VersionedIndex
+from .models import RestaurantMenuItem
+
+
+MENU_VERSION = 'menu'
+
+
+class AvailabilityIndex:
+    """Restaurant × product boolean matrix of what is on sale right now."""
+
+    def __init__(self, pairs):
+        pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+        restaurant_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        product_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+        self.restaurant_rows = {restaurant_id: row for row, restaurant_id in enumerate(restaurant_ids.tolist())}
+        self.product_columns = {product_id: column for column, product_id in enumerate(product_ids.tolist())}
+
+        self.matrix = np.zeros((len(restaurant_ids), len(product_ids)), dtype=bool)
+        self.matrix[rows, columns] = True
+
+    @classmethod
+    def build(cls):
+        pairs = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('restaurant_id', 'product_id')
+        )
+        return cls(pairs)
+
+    def set_availability(self, restaurant_id, product_id, available):
+        if restaurant_id not in self.restaurant_rows:
+            if not available:
+                return
+            self.restaurant_rows[restaurant_id] = len(self.restaurant_rows)
+            self.matrix = np.vstack([self.matrix, np.zeros((1, self.matrix.shape[1]), dtype=bool)])
+        if product_id not in self.product_columns:
+            if not available:
+                return
+            self.product_columns[product_id] = len(self.product_columns)
+            self.matrix = np.hstack([self.matrix, np.zeros((self.matrix.shape[0], 1), dtype=bool)])
+        self.matrix[self.restaurant_rows[restaurant_id], self.product_columns[product_id]] = available
+
+    def get_rows(self, restaurant_ids):
+        """Return the matrix rows for `restaurant_ids`, -1 for restaurants with nothing on sale."""
+        return np.array([self.restaurant_rows.get(restaurant_id, -1) for restaurant_id in restaurant_ids], dtype=int)
+
+    def eligibility_matrix(self, product_sets, restaurant_ids):
+        """Return a (len(product_sets), len(restaurant_ids)) mask of who can cook every product of a set."""
+        rows = self.get_rows(restaurant_ids)
+        missing = np.ones((len(rows), self.matrix.shape[1] + 1), dtype=np.float32)
+        known = rows >= 0
+        missing[known, :-1] = ~self.matrix[rows[known]]
+
+        # The extra last column stands for products that no restaurant sells.
+        required = np.zeros((len(product_sets), self.matrix.shape[1] + 1), dtype=np.float32)
+        for row, product_ids in enumerate(product_sets):
+            for product_id in product_ids:
+                required[row, self.product_columns.get(product_id, -1)] = 1
+
+        return required @ missing.T == 0
+
+    def product_matrix(self, product_ids, restaurant_ids):
+        """Return a (len(product_ids), len(restaurant_ids)) mask of which restaurant sells which product."""
+        rows = self.get_rows(restaurant_ids)
+        columns = np.array([self.product_columns.get(product_id, -1) for product_id in product_ids], dtype=int)
+        available = np.zeros((len(columns), len(rows)), dtype=bool)
+        known_columns, known_rows = np.flatnonzero(columns >= 0), np.flatnonzero(rows >= 0)
+        available[np.ix_(known_columns, known_rows)] = self.matrix[np.ix_(rows[known_rows], columns[known_columns])].T
+        return available
+
+    def restaurants_for(self, product_ids, restaurant_ids):
+        """Return the subset of `restaurant_ids` able to cook all of `product_ids`."""
+        eligible = self.eligibility_matrix([product_ids], restaurant_ids)[0]
+        return [restaurant_id for restaurant_id, ok in zip(restaurant_ids, eligible) if ok]
+
+
+availability_index = VersionedIndex(MENU_VERSION, AvailabilityIndex.build)
+
+
+def get_availability_index():
+    return availability_index.get()
+
+
+def update_availability(restaurant_id, product_id, available):
+    availability_index.apply(
+        lambda index: index.set_availability(restaurant_id, product_id, available)
+    )
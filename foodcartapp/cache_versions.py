@@ -0,0 +1,53 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+
+def get_cache_key(name):
+    return f'foodcartapp:{name}-version'
+
+
+def get_version(name):
+    # A fresh timestamp rather than 1, so that an evicted key never brings back
+    # a version some process may still hold.
+    return cache.get_or_set(get_cache_key(name), time.time_ns(), timeout=None)
+
+
+def bump_version(name):
+    get_version(name)
+    try:
+        return cache.incr(get_cache_key(name))
+    except ValueError:
+        return get_version(name)
+
+
+class VersionedIndex:
+    """Process-local structure that is rebuilt whenever its cache version moves on.
+
+    Changes made in this process are applied in place; other processes see the
+    bumped version and rebuild on their next access.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.index = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.name)
+        with self.lock:
+            if self.index is None or self.version != version:
+                self.index = self.build()
+                self.version = version
+            return self.index
+
+    def apply(self, change):
+        with self.lock:
+            previous_version = self.version
+            version = bump_version(self.name)
+            if self.index is not None and version == previous_version + 1:
+                change(self.index)
+                self.version = version
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .feed import notify_orders_changed
+from .models import Order, OrderCandidate
+from .spatial import nearest_restaurants
+
+
+REFRESH_BATCH_SIZE = 500
+
+
+def refresh_order_candidates(orders):
+    """Recompute the materialized nearest restaurants of `orders` (an Order queryset).
+
+    Only unprocessed geocoded orders get candidates, other orders just lose
+    their stale ones.
+    """
+    order_ids = list(orders.values_list('id', flat=True))
+    for start in range(0, len(order_ids), REFRESH_BATCH_SIZE):
+        refresh_candidates_batch(order_ids[start:start + REFRESH_BATCH_SIZE])
+    return len(order_ids)
+
+
+def refresh_candidates_batch(order_ids):
+    """Rewrite the candidates of orders whose ranking changed; only those show up in the order feed."""
+    open_orders = (
+        Order.objects
+        .filter(id__in=order_ids, status='NP', latitude__isnull=False)
+        .prefetch_related('products')
+    )
+    rankings = {order_id: [] for order_id in order_ids}
+    for order in open_orders:
+        nearest = nearest_restaurants(
+            order.latitude,
+            order.longitude,
+            k=settings.NEAREST_RESTAURANTS_COUNT,
+            product_ids=[order_product.product_id for order_product in order.products.all()],
+        )
+        rankings[order.id] = [(restaurant_id, Decimal(f'{km:.3f}')) for restaurant_id, km in nearest]
+
+    stored_rankings = {order_id: [] for order_id in order_ids}
+    stored_candidates = (
+        OrderCandidate.objects
+        .filter(order_id__in=order_ids)
+        .order_by('order_id', 'rank')
+        .values_list('order_id', 'restaurant_id', 'distance_km')
+    )
+    for order_id, restaurant_id, distance_km in stored_candidates:
+        stored_rankings[order_id].append((restaurant_id, distance_km))
+
+    changed_ids = [order_id for order_id, ranking in rankings.items() if ranking != stored_rankings[order_id]]
+    if not changed_ids:
+        return
+    candidates = [
+        OrderCandidate(order_id=order_id, restaurant_id=restaurant_id, distance_km=distance_km, rank=rank)
+        for order_id in changed_ids
+        for rank, (restaurant_id, distance_km) in enumerate(rankings[order_id], start=1)
+    ]
+    with transaction.atomic():
+        OrderCandidate.objects.filter(order_id__in=changed_ids).delete()
+        OrderCandidate.objects.bulk_create(candidates)
+        Order.objects.filter(id__in=changed_ids).update(updated_at=timezone.now())
+        notify_orders_changed()
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_versions import get_version
+from .models import Product
+from .payloads import make_json_payload
+
+
+CATALOG_VERSION = 'catalog'
+
+
+def dump_products():
+    products = Product.objects.select_related('category').available()
+
+    dumped_products = list()
+    for product in products:
+        dumped_product = {
+            'id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'special_status': product.special_status,
+            'description': product.description,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name,
+            } if product.category else None,
+            'image': product.image.url,
+            'restaurant': {
+                'id': product.id,
+                'name': product.name,
+            }
+        }
+        dumped_products.append(dumped_product)
+    return dumped_products
+
+
+def get_catalog_snapshot():
+    """Return the catalog payload for the current version, serializing it at most once per version."""
+    cache_key = f'foodcartapp:catalog-payload:{get_version(CATALOG_VERSION)}'
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = make_json_payload(dump_products())
+        cache.set(cache_key, snapshot, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return snapshot
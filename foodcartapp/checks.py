@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Cache versions, restaurant load counters and kitchen queues live in the
+# default cache, so every process must talk to the same one.
+SHARED_CACHE_BACKENDS = [
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+]
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend in SHARED_CACHE_BACKENDS:
+        return []
+    return [
+        Error(
+            f'Кэш {backend} не общий для процессов сайта',
+            hint=(
+                'Укажите в CACHE_URL Redis или Memcached, например redis://localhost:6379/0, '
+                'иначе процессы не узнают об изменениях меню, каталога и заказов друг друга.'
+            ),
+            id='foodcartapp.E001',
+        )
+    ]
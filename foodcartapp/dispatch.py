@@ -0,0 +1,171 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from .availability import get_availability_index
+from .feed import notify_orders_changed
+from .geo import DistanceEngine
+from .load import adjust_load, get_restaurant_loads
+from .models import Order, OrderProduct, Restaurant
+
+
+# Orders a restaurant has been given but not handed to a courier yet.
+KITCHEN_STATUSES = ['NP', 'CK']
+
+
+def solve_assignment(distances, eligible, capacities, candidates=None):
+    """Assign every order (row) to at most one restaurant (column) minimizing the total distance.
+
+    `capacities[j]` is how many more orders restaurant j can take. Each
+    restaurant is expanded into that many slots, every order is linked to
+    the slots of its `candidates` nearest eligible restaurants and to a
+    private "unassigned" slot that costs more than any real assignment, so
+    the sparse matching first maximizes the number of assigned orders and
+    only then minimizes their distance. Without `candidates` every eligible
+    restaurant is considered and the result is exact.
+
+    Returns the restaurant column of every order, -1 for unassigned ones.
+    """
+    orders_count, restaurants_count = distances.shape
+    assignment = np.full(orders_count, -1)
+    costs = np.where(eligible & (capacities > 0), distances, np.inf)
+    if candidates is not None and candidates < restaurants_count:
+        nearest = np.argpartition(costs, candidates - 1, axis=1)[:, :candidates]
+    else:
+        nearest = np.broadcast_to(np.arange(restaurants_count), costs.shape)
+    edge_rows = np.repeat(np.arange(orders_count), nearest.shape[1])
+    edge_columns = nearest.ravel()
+    edge_costs = np.take_along_axis(costs, nearest, axis=1).ravel()
+    finite = np.isfinite(edge_costs)
+    if not finite.any():
+        return assignment
+    edge_rows, edge_columns, edge_costs = edge_rows[finite], edge_columns[finite], edge_costs[finite]
+
+    # A restaurant never needs more slots than orders linked to it.
+    slots = np.minimum(np.maximum(capacities, 0), np.bincount(edge_columns, minlength=restaurants_count))
+    first_slot = np.concatenate([[0], np.cumsum(slots)[:-1]])
+    edge_slots = slots[edge_columns]
+    slot_rows = np.repeat(edge_rows, edge_slots)
+    slot_costs = np.repeat(edge_costs, edge_slots)
+    slot_offsets = np.arange(len(slot_rows)) - np.repeat(np.cumsum(edge_slots) - edge_slots, edge_slots)
+    slot_columns = np.repeat(first_slot[edge_columns], edge_slots) + slot_offsets
+
+    # Every order is matched exactly once, so shifting all costs by one keeps
+    # the optimum and stops zero distances from being dropped as missing edges.
+    slot_costs += 1
+    slots_count = int(slots.sum())
+    unassigned_cost = slot_costs.max() * orders_count + 1
+    graph = csr_matrix(
+        (
+            np.concatenate([slot_costs, np.full(orders_count, unassigned_cost)]),
+            (
+                np.concatenate([slot_rows, np.arange(orders_count)]),
+                np.concatenate([slot_columns, slots_count + np.arange(orders_count)]),
+            ),
+        ),
+        shape=(orders_count, slots_count + orders_count),
+    )
+    rows, matched_slots = min_weight_full_bipartite_matching(graph)
+
+    slot_restaurants = np.repeat(np.arange(restaurants_count), slots)
+    assigned = matched_slots < slots_count
+    assignment[rows[assigned]] = slot_restaurants[matched_slots[assigned]]
+    return assignment
+
+
+def get_pending_orders(lock=False):
+    """Return unassigned geocoded unprocessed orders and their product sets.
+
+    With `lock`, inside a transaction, the orders are locked until it ends
+    and orders locked by someone else, e.g. another dispatch, are skipped.
+    """
+    orders = (
+        Order.objects
+        .filter(status='NP', cooking_restaurant__isnull=True, latitude__isnull=False)
+        .order_by('id')
+        .values_list('id', 'latitude', 'longitude')
+    )
+    if lock:
+        orders = orders.select_for_update(skip_locked=True)
+    orders = list(orders)
+    product_sets = defaultdict(set)
+    order_products = (
+        OrderProduct.objects
+        .filter(order__status='NP', order__cooking_restaurant__isnull=True, order__latitude__isnull=False)
+        .values_list('order_id', 'product_id')
+    )
+    for order_id, product_id in order_products:
+        product_sets[order_id].add(product_id)
+    return orders, product_sets
+
+
+@transaction.atomic
+def dispatch_orders(dry_run=False):
+    """Assign cooking restaurants to all unassigned geocoded unprocessed orders at once.
+
+    Returns (order_id, restaurant_id, distance_km) for every assigned order.
+    """
+    orders, product_sets = get_pending_orders(lock=not dry_run)
+    restaurants = list(Restaurant.objects.filter(latitude__isnull=False, longitude__isnull=False).order_by('id'))
+    if not orders or not restaurants:
+        return []
+
+    engine = DistanceEngine(restaurants)
+    distances = engine.distance_matrix([(latitude, longitude) for _, latitude, longitude in orders])
+    eligible = get_availability_index().eligibility_matrix(
+        [product_sets[order_id] for order_id, _, _ in orders],
+        [restaurant.id for restaurant in engine.restaurants],
+    )
+    loads = get_restaurant_loads([restaurant.id for restaurant in engine.restaurants])
+    capacities = np.array([
+        settings.RESTAURANT_CAPACITY - sum(loads[restaurant.id][status] for status in KITCHEN_STATUSES)
+        for restaurant in engine.restaurants
+    ])
+    assignment = solve_assignment(distances, eligible, capacities, candidates=settings.DISPATCH_CANDIDATES)
+
+    assignments = [
+        (order_id, engine.restaurants[column].id, round(float(distances[row, column]), 3))
+        for row, ((order_id, _, _), column) in enumerate(zip(orders, assignment.tolist()))
+        if column >= 0
+    ]
+    if dry_run or not assignments:
+        return assignments
+
+    # Databases without SELECT ... FOR UPDATE lock nothing, so an order may
+    # have been assigned or processed since it was read: only orders that
+    # are still unassigned are updated and counted.
+    order_ids = [order_id for order_id, _, _ in assignments]
+    still_pending = set(
+        Order.objects
+        .filter(pk__in=order_ids, status='NP', cooking_restaurant__isnull=True)
+        .values_list('id', flat=True)
+    )
+    assignments = [assignment for assignment in assignments if assignment[0] in still_pending]
+    orders_per_restaurant = defaultdict(list)
+    for order_id, restaurant_id, _ in assignments:
+        orders_per_restaurant[restaurant_id].append(order_id)
+
+    now = timezone.now()
+    assigned_per_restaurant = {
+        restaurant_id: (
+            Order.objects
+            .filter(pk__in=restaurant_order_ids, status='NP', cooking_restaurant__isnull=True)
+            .update(cooking_restaurant_id=restaurant_id, updated_at=now)
+        )
+        for restaurant_id, restaurant_order_ids in orders_per_restaurant.items()
+    }
+
+    # QuerySet.update sends no signals, so the load counters are moved here.
+    def update_loads():
+        for restaurant_id, orders_count in assigned_per_restaurant.items():
+            adjust_load(restaurant_id, 'NP', orders_count)
+
+    if assignments:
+        notify_orders_changed()
+        transaction.on_commit(update_loads)
+    return assignments
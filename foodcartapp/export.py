@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .models import Order, OrderProduct
+
+
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = ['csv', 'ndjson']
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+ORDER_FIELDS = [
+    'id', 'registered_at', 'called_at', 'delivered_at', 'status', 'payment_method',
+    'firstname', 'lastname', 'phonenumber', 'address', 'comment', 'cooking_restaurant_id', 'total_cost',
+]
+LINE_FIELDS = ['product_id', 'product_name', 'quantity', 'price']
+
+# Spreadsheets run cells starting with these as formulas.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def get_export_orders(registered_after=None, registered_before=None):
+    """Rows of ORDER_FIELDS values of orders registered in [registered_after, registered_before)."""
+    orders = (
+        Order.objects
+        .order_by('registered_at', 'id')
+        .values_list(*(
+            # The stored E.164 string as it is, without parsing every number into a PhoneNumber.
+            Cast(field, CharField()) if field == 'phonenumber' else field
+            for field in ORDER_FIELDS
+        ))
+    )
+    if registered_after:
+        orders = orders.filter(registered_at__gte=registered_after)
+    if registered_before:
+        orders = orders.filter(registered_at__lt=registered_before)
+    return orders
+
+
+def get_order_lines(order_ids):
+    """Return {order_id: [line, ...]} for a batch of orders in one query."""
+    lines = defaultdict(list)
+    rows = (
+        OrderProduct.objects
+        .filter(order_id__in=order_ids)
+        .order_by('order_id', 'id')
+        .values_list('order_id', 'product_id', 'product__name', 'quantity', 'price')
+    )
+    for order_id, *line in rows:
+        lines[order_id].append(dict(zip(LINE_FIELDS, line)))
+    return lines
+
+
+def iterate_orders(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of up to `chunk_size` (order, lines) pairs.
+
+    QuerySet.iterator reads through a server-side cursor where the database
+    supports it, and the lines of each chunk come with one more query, so
+    memory does not grow with the number of orders.
+    """
+    rows = orders.iterator(chunk_size=chunk_size)
+    while chunk := [dict(zip(ORDER_FIELDS, row)) for row in islice(rows, chunk_size)]:
+        lines = get_order_lines([order['id'] for order in chunk])
+        yield [(order, lines.get(order['id'], [])) for order in chunk]
+
+
+def escape_formula(value):
+    """Make a text cell read as text: customer-typed names, addresses and comments must not run as formulas."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def export_csv(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV text, one row per order line; orders without lines get a row of their own."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=ORDER_FIELDS + LINE_FIELDS)
+    # The byte order mark makes Excel read the file as UTF-8.
+    buffer.write('\ufeff')
+    writer.writeheader()
+    for chunk in iterate_orders(orders, chunk_size):
+        for order, lines in chunk:
+            for line in lines or [{}]:
+                writer.writerow({field: escape_formula(value) for field, value in {**order, **line}.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # No orders at all, just the header.
+        yield buffer.getvalue()
+
+
+def export_ndjson(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield NDJSON text, one order with its lines per line."""
+    for chunk in iterate_orders(orders, chunk_size):
+        yield ''.join(
+            json.dumps(
+                {**order, 'products': lines},
+                cls=DjangoJSONEncoder,
+                ensure_ascii=False,
+            ) + '\n'
+            for order, lines in chunk
+        )
+
+
+def export_orders(orders, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    exporters = {'csv': export_csv, 'ndjson': export_ndjson}
+    return exporters[file_format](orders, chunk_size)
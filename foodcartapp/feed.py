@@ -0,0 +1,132 @@
+import base64
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import bump_version, get_version
+from .models import Order
+
+
+ORDERS_VERSION = 'orders'
+
+# Long enough for the dashboard to come back with the cursor, retries included.
+FEED_SEEN_TIMEOUT = 5 * 60
+
+
+class InvalidFeedCursor(ValueError):
+    pass
+
+
+def notify_orders_changed():
+    transaction.on_commit(lambda: bump_version(ORDERS_VERSION))
+
+
+def get_lookback():
+    return timedelta(seconds=settings.ORDER_FEED_LOOKBACK)
+
+
+def get_seen_key(token):
+    return f'foodcartapp:feed-seen:{token}'
+
+
+def encode_feed_cursor(watermark, seen):
+    """Return a cursor holding the latest updated_at sent and the cache key of `seen`.
+
+    `seen`, {order id: updated_at} of orders sent within the lookback window,
+    stays on the server: it grows with the number of recent changes, the
+    cursor does not. The key is a digest of `seen`, so managers whose feeds
+    are in the same state share one cache entry.
+    """
+    pairs = sorted((order_id, updated_at.isoformat()) for order_id, updated_at in seen.items())
+    token = hashlib.sha1(json.dumps(pairs, separators=(',', ':')).encode()).hexdigest()
+    cache.set(get_seen_key(token), seen, timeout=FEED_SEEN_TIMEOUT)
+    position = [watermark.isoformat() if watermark else None, token]
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+
+def decode_feed_cursor(cursor):
+    """Return the watermark and the cache key of the orders seen of a cursor."""
+    try:
+        watermark, token = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        watermark = datetime.fromisoformat(watermark) if watermark else None
+        if not re.fullmatch(r'[0-9a-f]{40}', token):
+            raise ValueError(token)
+        return watermark, token
+    except (ValueError, TypeError) as error:
+        raise InvalidFeedCursor(cursor) from error
+
+
+def get_seen_orders(token):
+    """Return {order id: updated_at} of a cursor, or an empty dict once the cache has dropped it."""
+    # Without it the window is sent again; the dashboard just redraws those rows.
+    return cache.get(get_seen_key(token)) or {}
+
+
+def get_feed_cursor():
+    """Return the cursor pointing right after the most recently changed order."""
+    watermark = Order.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+    if not watermark:
+        return encode_feed_cursor(None, {})
+    seen = Order.objects.filter(updated_at__gte=watermark - get_lookback()).values_list('id', 'updated_at')
+    return encode_feed_cursor(watermark, dict(seen))
+
+
+def get_changed_orders(orders, cursor, limit):
+    """Return up to `limit` orders changed after `cursor` and the cursor to continue from.
+
+    updated_at is set before the change commits, so an order may become
+    visible with an updated_at behind orders already sent. The lookback
+    window before the latest updated_at sent is therefore read again, and
+    orders sent already with the same updated_at are skipped. Only ids are
+    read for that; `orders` is queried for the changed ones alone.
+    """
+    watermark, token = decode_feed_cursor(cursor)
+    seen = get_seen_orders(token)
+    recent_orders = Order.objects.all()
+    if watermark:
+        recent_orders = recent_orders.filter(updated_at__gte=watermark - get_lookback())
+    # At most len(seen) of these were sent already.
+    recent_orders = recent_orders.order_by('updated_at', 'id').values_list('id', 'updated_at')[:limit + len(seen)]
+    changes = [(order_id, updated_at) for order_id, updated_at in recent_orders if seen.get(order_id) != updated_at]
+    changes = changes[:limit]
+    if not changes:
+        return [], cursor
+
+    found_orders = orders.in_bulk([order_id for order_id, _ in changes])
+    changed_orders = [found_orders[order_id] for order_id, _ in changes if order_id in found_orders]
+    last_updated_at = changes[-1][1]
+    watermark = max(watermark, last_updated_at) if watermark else last_updated_at
+    seen.update(changes)
+    window_start = watermark - get_lookback()
+    cursor = encode_feed_cursor(watermark, {
+        order_id: updated_at
+        for order_id, updated_at in seen.items()
+        if updated_at >= window_start
+    })
+    return changed_orders, cursor
+
+
+def wait_for_changed_orders(orders, cursor, limit, timeout, poll_interval=1):
+    """Long-poll: return orders changed after `cursor` as soon as there are any, or nothing after `timeout`.
+
+    While waiting only the cache version is polled, the orders table is
+    queried again only after someone changed an order.
+    """
+    deadline = time.monotonic() + timeout
+    checked_version = None
+    while True:
+        version = get_version(ORDERS_VERSION)
+        if version != checked_version:
+            checked_version = version
+            changed_orders, next_cursor = get_changed_orders(orders, cursor, limit)
+            if changed_orders:
+                return changed_orders, next_cursor
+        if time.monotonic() >= deadline:
+            return [], cursor
+        time.sleep(poll_interval)
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Haversine treats the Earth as a sphere, so it drifts from the WGS-84
+# geodesic used by geopy.distance.distance by at most ~0.5 %.
+HAVERSINE_TOLERANCE = 0.005
+
+
+def to_radians(points):
+    """Convert (lat, lon) pairs in degrees (Decimal, str or float) to an (n, 2) radians array."""
+    return np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+
+
+def haversine_matrix(points, others):
+    """Return great-circle distances in km between every pair of radian (lat, lon) rows."""
+    lat1 = points[:, 0, np.newaxis]
+    lon1 = points[:, 1, np.newaxis]
+    lat2 = others[np.newaxis, :, 0]
+    lon2 = others[np.newaxis, :, 1]
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class DistanceEngine:
+    def __init__(self, restaurants):
+        self.restaurants = [
+            restaurant for restaurant in restaurants
+            if restaurant.latitude is not None and restaurant.longitude is not None
+        ]
+        self.coordinates = to_radians([
+            (restaurant.latitude, restaurant.longitude)
+            for restaurant in self.restaurants
+        ])
+
+    def distance_matrix(self, points):
+        return haversine_matrix(to_radians(points), self.coordinates)
+
+    def top_candidates(self, points, k=None, mask=None):
+        """Return, for every (lat, lon) point, its (restaurant, km) pairs sorted by distance.
+
+        `mask` is an optional boolean array shaped (len(points), len(restaurants))
+        that marks which restaurants may serve each point.
+        """
+        if not len(points) or not self.restaurants:
+            return [[] for _ in points]
+
+        distances = self.distance_matrix(points)
+        if mask is not None:
+            distances = np.where(mask, distances, np.inf)
+
+        if k is not None and k < distances.shape[1]:
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+        else:
+            nearest = np.argsort(distances, axis=1)
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+
+        finite = np.isfinite(nearest_distances)
+        return [
+            [
+                (self.restaurants[index], km)
+                for index, km in zip(row[row_finite].tolist(), row_distances[row_finite].tolist())
+            ]
+            for row, row_distances, row_finite in zip(nearest, nearest_distances, finite)
+        ]
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import bump_version, get_version
+from .models import Order
+from .payloads import make_json_payload
+
+
+def get_kitchen_version_name(restaurant_id):
+    return f'kitchen-{restaurant_id}'
+
+
+def get_kitchen_version(restaurant_id):
+    return get_version(get_kitchen_version_name(restaurant_id))
+
+
+def notify_kitchens_changed(*restaurant_ids):
+    restaurant_ids = {restaurant_id for restaurant_id in restaurant_ids if restaurant_id}
+
+    def bump():
+        for restaurant_id in restaurant_ids:
+            bump_version(get_kitchen_version_name(restaurant_id))
+
+    if restaurant_ids:
+        transaction.on_commit(bump)
+
+
+def dump_kitchen_queue(restaurant_id):
+    orders = (
+        Order.objects
+        .filter(cooking_restaurant_id=restaurant_id, status='CK')
+        .prefetch_related('products__product')
+        .order_by('called_at', 'id')
+    )
+    return [
+        {
+            'id': order.id,
+            'called_at': order.called_at,
+            'comment': order.comment,
+            'products': [
+                {
+                    'name': order_product.product.name,
+                    'quantity': order_product.quantity,
+                }
+                for order_product in order.products.all()
+            ],
+        }
+        for order in orders
+    ]
+
+
+def get_kitchen_snapshot(restaurant_id, version):
+    """Return the kitchen queue payload of the restaurant, querying orders at most once per version."""
+    cache_key = f'foodcartapp:kitchen-payload:{restaurant_id}:{version}'
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = make_json_payload({
+            'version': version,
+            'orders': dump_kitchen_queue(restaurant_id),
+        })
+        cache.set(cache_key, snapshot, timeout=settings.KITCHEN_CACHE_TIMEOUT)
+    return snapshot
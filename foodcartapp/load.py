@@ -0,0 +1,121 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Order, Restaurant
+
+
+# Statuses of orders a restaurant is busy with once it has been assigned:
+# waiting for the kitchen, cooking and out for delivery.
+LOAD_STATUSES = ['NP', 'CK', 'DL']
+
+READY_KEY = 'foodcartapp:restaurant-load:ready'
+# Bumped by every adjustment, so a reconciliation can tell it raced with one.
+ADJUSTMENTS_KEY = 'foodcartapp:restaurant-load:adjustments'
+RECONCILE_ATTEMPTS = 3
+
+
+def get_load_key(restaurant_id, status):
+    return f'foodcartapp:restaurant-load:{restaurant_id}:{status}'
+
+
+def count_loads(restaurant_ids=None):
+    """Return {(restaurant_id, status): orders} straight from the database."""
+    orders = Order.objects.filter(cooking_restaurant__isnull=False, status__in=LOAD_STATUSES)
+    if restaurant_ids is not None:
+        orders = orders.filter(cooking_restaurant_id__in=restaurant_ids)
+    rows = (
+        orders
+        .values_list('cooking_restaurant_id', 'status')
+        .annotate(orders=Count('id'))
+        .order_by()
+    )
+    return {(restaurant_id, status): orders for restaurant_id, status, orders in rows}
+
+
+def reconcile_loads(fix=True, restaurant_ids=None):
+    """Compare cached counters of `restaurant_ids`, all restaurants by default, with the database and, if `fix`, overwrite them.
+
+    An adjustment made between the count and the write would be lost, so the
+    count is repeated while adjustments keep coming in. If they never stop,
+    the ready flag stays off and the next read reconciles again.
+
+    Returns (restaurant_id, status, cached, actual) for every counter that was off.
+    """
+    all_restaurants = restaurant_ids is None
+    if all_restaurants:
+        restaurant_ids = Restaurant.objects.values_list('id', flat=True)
+    keys = {
+        get_load_key(restaurant_id, status): (restaurant_id, status)
+        for restaurant_id in restaurant_ids
+        for status in LOAD_STATUSES
+    }
+    cached = cache.get_many(keys)
+    for _ in range(RECONCILE_ATTEMPTS):
+        adjustments = cache.get(ADJUSTMENTS_KEY)
+        loads = count_loads(None if all_restaurants else restaurant_ids)
+        if not fix:
+            break
+        cache.set_many({
+            key: loads.get(pair, 0)
+            for key, pair in keys.items()
+        }, timeout=None)
+        if cache.get(ADJUSTMENTS_KEY) == adjustments:
+            if all_restaurants:
+                cache.set(READY_KEY, True, timeout=None)
+            break
+    return [
+        (restaurant_id, status, cached.get(key, 0), loads.get((restaurant_id, status), 0))
+        for key, (restaurant_id, status) in keys.items()
+        if cached.get(key, 0) != loads.get((restaurant_id, status), 0)
+    ]
+
+
+def get_restaurant_loads(restaurant_ids):
+    """Return {restaurant_id: {status: orders}} from the cache, one round trip for all restaurants."""
+    if not cache.get(READY_KEY):
+        reconcile_loads()
+    keys = {
+        get_load_key(restaurant_id, status): (restaurant_id, status)
+        for restaurant_id in restaurant_ids
+        for status in LOAD_STATUSES
+    }
+    cached = cache.get_many(keys)
+    loads = {restaurant_id: dict.fromkeys(LOAD_STATUSES, 0) for restaurant_id in restaurant_ids}
+    for key, (restaurant_id, status) in keys.items():
+        loads[restaurant_id][status] = max(cached.get(key, 0), 0)
+    return loads
+
+
+def adjust_load(restaurant_id, status, delta):
+    if not delta or restaurant_id is None or status not in LOAD_STATUSES:
+        return
+    # Bumped before the counter: a reconciliation that overwrites this
+    # adjustment is then sure to notice it.
+    cache.add(ADJUSTMENTS_KEY, 0, timeout=None)
+    try:
+        cache.incr(ADJUSTMENTS_KEY)
+    except ValueError:
+        # Evicted in between, which a running reconciliation notices as well.
+        pass
+    try:
+        cache.incr(get_load_key(restaurant_id, status), delta)
+    except ValueError:
+        # The counter was evicted. Starting it from zero would undercount, so
+        # recount the restaurant; the database already has this change.
+        cache.delete(READY_KEY)
+        reconcile_loads(restaurant_ids=[restaurant_id])
+
+
+def track_load_change(before, after):
+    """Move an order between counters on commit; `before`/`after` are (restaurant_id, status) or None."""
+    if before == after:
+        return
+
+    def update():
+        if before:
+            adjust_load(*before, -1)
+        if after:
+            adjust_load(*after, 1)
+
+    transaction.on_commit(update)
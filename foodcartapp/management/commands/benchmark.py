@@ -0,0 +1,277 @@
+import pickle
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from geopy import distance
+
+from foodcartapp.availability import AvailabilityIndex
+from foodcartapp.dispatch import solve_assignment
+from foodcartapp.geo import DistanceEngine, HAVERSINE_TOLERANCE
+from foodcartapp.models import RestaurantMenuItem
+from foodcartapp.split import greedy_cover, plan_cover, prune_options
+
+
+def random_points(rng, count):
+    latitudes = rng.uniform(55.55, 55.95, count)
+    longitudes = rng.uniform(37.35, 37.85, count)
+    return np.column_stack([latitudes, longitudes])
+
+
+def measure(function, *args, **kwargs):
+    started_at = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started_at
+
+
+class Command(BaseCommand):
+    help = 'Измеряет скорость алгоритмов диспетчеризации на синтетических данных'
+
+    subjects = ['distances', 'assignment', 'split', 'menu']
+
+    def add_arguments(self, parser):
+        parser.add_argument('subject', choices=self.subjects)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--restaurants', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--capacity', type=int, default=settings.RESTAURANT_CAPACITY)
+        parser.add_argument('--candidates', type=int, default=settings.DISPATCH_CANDIDATES)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        getattr(self, f'benchmark_{options["subject"]}')(rng, **options)
+
+    def report(self, name, seconds):
+        self.stdout.write(f'{name:<40} {seconds * 1000:10.1f} ms')
+
+    def benchmark_distances(self, rng, orders, restaurants, **options):
+        order_points = random_points(rng, orders)
+        restaurants = [
+            SimpleNamespace(id=index, latitude=lat, longitude=lon)
+            for index, (lat, lon) in enumerate(random_points(rng, restaurants))
+        ]
+
+        def geodesic_ranking():
+            return [
+                sorted(
+                    distance.distance(point, (restaurant.latitude, restaurant.longitude)).km
+                    for restaurant in restaurants
+                )
+                for point in order_points
+            ]
+
+        engine = DistanceEngine(restaurants)
+        geodesic, geodesic_seconds = measure(geodesic_ranking)
+        _, matrix_seconds = measure(engine.distance_matrix, order_points)
+        candidates, engine_seconds = measure(engine.top_candidates, order_points)
+
+        vectorized = np.array([[km for _, km in row] for row in candidates])
+        relative_error = np.max(np.abs(vectorized - np.array(geodesic)) / np.array(geodesic))
+
+        self.stdout.write(f'{len(order_points)} заказов × {len(restaurants)} ресторанов')
+        self.report('geopy.distance, по одной паре', geodesic_seconds)
+        self.report('DistanceEngine.distance_matrix', matrix_seconds)
+        self.report('DistanceEngine.top_candidates', engine_seconds)
+        self.stdout.write(f'ускорение: {geodesic_seconds / engine_seconds:.0f}×')
+        self.stdout.write(
+            f'макс. относительная ошибка: {relative_error:.5f} (допуск {HAVERSINE_TOLERANCE})'
+        )
+        if relative_error > HAVERSINE_TOLERANCE:
+            self.stderr.write('Погрешность превышает допуск')
+
+    def benchmark_assignment(self, rng, orders, restaurants, products, capacity, candidates, **options):
+        order_points = random_points(rng, orders)
+        restaurants = [
+            SimpleNamespace(id=index, latitude=lat, longitude=lon)
+            for index, (lat, lon) in enumerate(random_points(rng, restaurants))
+        ]
+        menu = AvailabilityIndex(
+            (restaurant.id, product_id)
+            for restaurant in restaurants
+            for product_id in range(products)
+            if rng.random() < 0.8
+        )
+        product_sets = [
+            set(rng.choice(products, size=rng.integers(1, 5), replace=False).tolist())
+            for _ in order_points
+        ]
+        restaurant_ids = [restaurant.id for restaurant in restaurants]
+        capacities = np.full(len(restaurants), capacity)
+
+        engine = DistanceEngine(restaurants)
+        distances, distances_seconds = measure(engine.distance_matrix, order_points)
+        eligible, eligibility_seconds = measure(menu.eligibility_matrix, product_sets, restaurant_ids)
+        assignment, solve_seconds = measure(solve_assignment, distances, eligible, capacities, candidates)
+        exact, exact_seconds = measure(solve_assignment, distances, eligible, capacities)
+
+        def greedy_assignment():
+            left = capacities.copy()
+            greedy = np.full(len(order_points), -1)
+            for row in range(len(order_points)):
+                columns = np.flatnonzero(eligible[row] & (left > 0))
+                if len(columns):
+                    column = columns[np.argmin(distances[row, columns])]
+                    greedy[row] = column
+                    left[column] -= 1
+            return greedy
+
+        greedy, greedy_seconds = measure(greedy_assignment)
+
+        def summary(result):
+            rows = np.flatnonzero(result >= 0)
+            loads = np.bincount(result[rows], minlength=len(restaurants))
+            assert eligible[rows, result[rows]].all() and (loads <= capacities).all()
+            return len(rows), distances[rows, result[rows]].sum()
+
+        assigned, total_km = summary(assignment)
+        exact_assigned, exact_km = summary(exact)
+        greedy_assigned, greedy_km = summary(greedy)
+        total_seconds = distances_seconds + eligibility_seconds + solve_seconds
+
+        self.stdout.write(
+            f'{len(order_points)} заказов × {len(restaurants)} ресторанов, до {capacity} заказов на ресторан'
+        )
+        self.report('DistanceEngine.distance_matrix', distances_seconds)
+        self.report('AvailabilityIndex.eligibility_matrix', eligibility_seconds)
+        self.report(f'solve_assignment, {candidates} ближайших', solve_seconds)
+        self.report('всего', total_seconds)
+        self.report('solve_assignment, все рестораны', exact_seconds)
+        self.report('жадно по одному заказу', greedy_seconds)
+        self.stdout.write(f'{candidates} ближайших: назначено {assigned}, {total_km:.1f} км')
+        self.stdout.write(f'точно:      назначено {exact_assigned}, {exact_km:.1f} км')
+        self.stdout.write(f'жадно:      назначено {greedy_assigned}, {greedy_km:.1f} км')
+        if total_seconds > 1:
+            self.stderr.write('Распределение заняло больше секунды')
+
+    def benchmark_split(self, rng, orders, restaurants, products, **options):
+        order_points = random_points(rng, orders)
+        restaurant_points = random_points(rng, restaurants)
+        # Sparse menus: most orders can't be cooked by a single restaurant.
+        menus = rng.random((restaurants, products)) < 0.05
+        product_lists = [
+            np.sort(rng.choice(products, size=rng.integers(3, 13), replace=False))
+            for _ in order_points
+        ]
+        engine = DistanceEngine([
+            SimpleNamespace(id=index, latitude=lat, longitude=lon)
+            for index, (lat, lon) in enumerate(restaurant_points)
+        ])
+
+        def get_options(row, product_ids):
+            selling = menus[:, product_ids]
+            sells_any = np.flatnonzero(selling.any(axis=1))
+            packed = np.packbits(selling[sells_any], axis=1, bitorder='little')
+            masks = [int.from_bytes(packed_row.tobytes(), 'little') for packed_row in packed]
+            distances = engine.distance_matrix(order_points[row:row + 1])[0, sells_any].tolist()
+            return masks, distances, (1 << len(product_ids)) - 1
+
+        def plan_all():
+            plans = []
+            for row, product_ids in enumerate(product_lists):
+                masks, distances, full_mask = get_options(row, product_ids)
+                started_at = time.perf_counter()
+                chosen = plan_cover(masks, distances, full_mask)
+                plans.append((chosen, masks, distances, full_mask, time.perf_counter() - started_at))
+            return plans
+
+        def exact_cover(masks, distances, full_mask):
+            # Dynamic programming over all subsets of the order's products.
+            count_weight = sum(distances) + 1
+            best = np.full(full_mask + 1, np.inf)
+            best[0] = 0
+            states = np.arange(full_mask + 1)
+            for mask, km in zip(masks, distances):
+                np.minimum.at(best, states | mask, best + count_weight + km)
+            return divmod(best[full_mask], count_weight) if np.isfinite(best[full_mask]) else None
+
+        plans, plan_seconds = measure(plan_all)
+        solve_times = np.array([plan[-1] for plan in plans])
+
+        checked = mismatches = 0
+        greedy_extra = []
+        for chosen, masks, distances, full_mask, _ in plans[:50]:
+            expected = exact_cover(masks, distances, full_mask)
+            found = chosen and (len(chosen), sum(distances[index] for index in chosen))
+            checked += 1
+            if bool(found) != bool(expected) or (
+                found and (found[0] != expected[0] or abs(found[1] - expected[1]) > 1e-6)
+            ):
+                mismatches += 1
+            greedy = greedy_cover(prune_options(masks, distances, full_mask), distances, full_mask)
+            if found and greedy:
+                greedy_extra.append(greedy[0] - found[0])
+
+        covered = [plan[0] for plan in plans if plan[0]]
+        self.stdout.write(
+            f'{len(order_points)} заказов по 3–12 товаров, {restaurants} ресторанов, {products} товаров в меню'
+        )
+        self.report('всего, с подготовкой битовых масок', plan_seconds)
+        self.report('plan_cover, в среднем на заказ', solve_times.mean())
+        self.report('plan_cover, худший заказ', solve_times.max())
+        self.stdout.write(
+            f'можно собрать {len(covered)} заказов, в среднем из '
+            f'{np.mean([len(chosen) for chosen in covered]):.2f} ресторанов'
+        )
+        self.stdout.write(f'жадный алгоритм берёт лишние рестораны в {np.count_nonzero(greedy_extra)} из {len(greedy_extra)} заказов')
+        self.stdout.write(f'сверено с точным перебором: {checked} заказов, расхождений {mismatches}')
+        if mismatches:
+            self.stderr.write('План не совпадает с точным перебором')
+
+    def benchmark_menu(self, rng, restaurants, products, **options):
+        restaurant_ids = list(range(restaurants))
+        product_ids = list(range(products))
+        # Every restaurant lists most products, some of them are off sale.
+        listed = rng.random((products, restaurants)) < 0.7
+        on_sale = listed & (rng.random((products, restaurants)) < 0.9)
+        pairs = [
+            (restaurant_id, product_id)
+            for product_id, restaurant_id in zip(*np.nonzero(on_sale))
+        ]
+        menu_items = {
+            product_id: [
+                SimpleNamespace(restaurant_id=restaurant_id, availability=bool(on_sale[product_id, restaurant_id]))
+                for restaurant_id in np.flatnonzero(listed[product_id]).tolist()
+            ]
+            for product_id in product_ids
+        }
+
+        def walk_menu_items():
+            # What view_products used to do with prefetched menu items.
+            table = []
+            for product_id in product_ids:
+                availability = {item.restaurant_id: item.availability for item in menu_items[product_id]}
+                table.append([availability.get(restaurant_id, False) for restaurant_id in restaurant_ids])
+            return table
+
+        def build_packed_matrix():
+            available = AvailabilityIndex(pairs).product_matrix(product_ids, restaurant_ids)
+            return pickle.dumps(np.packbits(available, axis=1))
+
+        def read_packed_matrix(cached):
+            packed = pickle.loads(cached)
+            return np.unpackbits(packed, axis=1, count=len(restaurant_ids)).astype(bool).tolist()
+
+        def instantiate_menu_items():
+            # prefetch_related('menu_items') also builds a model instance per row.
+            return [
+                RestaurantMenuItem(restaurant_id=item.restaurant_id, product_id=product_id, availability=item.availability)
+                for product_id, items in menu_items.items()
+                for item in items
+            ]
+
+        _, instantiate_seconds = measure(instantiate_menu_items)
+        walked, walk_seconds = measure(walk_menu_items)
+        cached, build_seconds = measure(build_packed_matrix)
+        table, read_seconds = measure(read_packed_matrix, cached)
+        if table != walked:
+            self.stderr.write('Таблица не совпадает с обходом пунктов меню')
+
+        self.stdout.write(f'{products} товаров × {restaurants} ресторанов, {len(pairs)} пунктов меню в продаже')
+        self.report('объекты RestaurantMenuItem из prefetch', instantiate_seconds)
+        self.report('словарь на товар и обход ресторанов', walk_seconds)
+        self.report('сборка матрицы из values_list', build_seconds)
+        self.report('чтение из кэша и распаковка', read_seconds)
+        self.stdout.write(f'размер в кэше: {len(cached) / 1024:.0f} КБ')
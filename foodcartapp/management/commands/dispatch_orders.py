@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.dispatch import dispatch_orders
+
+
+class Command(BaseCommand):
+    help = 'Назначает необработанным заказам ближайшие рестораны с учётом меню и загрузки'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать распределение, ничего не сохраняя',
+        )
+
+    def handle(self, *args, dry_run, **options):
+        assignments = dispatch_orders(dry_run=dry_run)
+        for order_id, restaurant_id, km in assignments:
+            self.stdout.write(f'Заказ {order_id}: ресторан {restaurant_id}, {km} км')
+        total_km = sum(km for _, _, km in assignments)
+        self.stdout.write(f'Назначено {len(assignments)} заказов, суммарно {total_km:.3f} км')
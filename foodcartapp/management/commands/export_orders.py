@@ -0,0 +1,57 @@
+import datetime
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from foodcartapp.export import EXPORT_CHUNK_SIZE, FORMATS, export_orders, get_export_orders
+
+
+def parse_moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заказы с их позициями в CSV или NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--registered-after', type=parse_moment,
+            help='Заказы, зарегистрированные начиная с этой даты или момента',
+        )
+        parser.add_argument(
+            '--registered-before', type=parse_moment,
+            help='Заказы, зарегистрированные раньше этой даты или момента',
+        )
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, format, output, registered_after, registered_before, chunk_size, **options):
+        if registered_after and registered_before and registered_after >= registered_before:
+            raise CommandError('--registered-after должен быть раньше --registered-before')
+        orders = get_export_orders(registered_after=registered_after, registered_before=registered_before)
+
+        started_at = time.monotonic()
+        stream = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+        try:
+            for text in export_orders(orders, format, chunk_size):
+                stream.write(text)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        if stream is not sys.stdout:
+            self.stdout.write(f'Заказы выгружены в {output} за {time.monotonic() - started_at:.1f} с')
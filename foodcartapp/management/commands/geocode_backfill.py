@@ -0,0 +1,125 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.cache_versions import bump_version
+from foodcartapp.candidates import refresh_order_candidates
+from foodcartapp.models import Order, Restaurant
+from foodcartapp.spatial import RESTAURANTS_VERSION
+from places.geocoder import (
+    GeocoderUnavailable,
+    fetch_coordinates,
+    get_cached_coordinates,
+    normalize_address,
+    save_coordinates,
+    set_rate_limit,
+)
+
+
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    'orders': Order,
+    'restaurants': Restaurant,
+}
+
+
+def fetch(address):
+    """Return (answered, coordinates); unanswered addresses are retried on the next run."""
+    try:
+        return True, fetch_coordinates(address)
+    except GeocoderUnavailable:
+        logger.exception('Не удалось определить координаты адреса %s', address)
+        return False, None
+
+
+class Command(BaseCommand):
+    help = 'Заполняет координаты заказов и ресторанов, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='model',
+            help=f'Что заполнять: {", ".join(MODELS)}. По умолчанию всё',
+        )
+        parser.add_argument('--workers', type=int, default=settings.GEOCODER_WORKERS)
+        parser.add_argument('--qps', type=float, default=settings.GEOCODER_RATE_LIMIT)
+        parser.add_argument('--batch-size', type=int, default=500)
+        # Orders and restaurants have ids of their own, so each resumes from its own one.
+        parser.add_argument(
+            '--after-order-id', type=int, default=0,
+            help='Продолжить с заказов, id которых больше указанного',
+        )
+        parser.add_argument(
+            '--after-restaurant-id', type=int, default=0,
+            help='Продолжить с ресторанов, id которых больше указанного',
+        )
+
+    def handle(self, *args, models, workers, qps, batch_size, after_order_id, after_restaurant_id, **options):
+        unknown_models = set(models) - set(MODELS)
+        if unknown_models:
+            raise CommandError(f'Неизвестные модели: {", ".join(sorted(unknown_models))}')
+        after_ids = {'orders': after_order_id, 'restaurants': after_restaurant_id}
+
+        set_rate_limit(qps)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill') as executor:
+            resolved = {
+                name: self.backfill(MODELS[name], executor, batch_size, after_ids[name])
+                for name in models or MODELS
+            }
+        if resolved.get('restaurants'):
+            refreshed = refresh_order_candidates(Order.objects.filter(status='NP'))
+            self.stdout.write(f'Пересчитаны ближайшие рестораны {refreshed} заказов')
+
+    def backfill(self, model, executor, batch_size, after_id):
+        rows = (
+            model.objects
+            .filter(latitude__isnull=True, pk__gt=after_id)
+            .exclude(address='')
+            .order_by('pk')
+            .values_list('pk', 'address')
+            .iterator(chunk_size=batch_size)
+        )
+        started_at = time.monotonic()
+        processed = resolved = 0
+        while batch := list(islice(rows, batch_size)):
+            addresses = {normalize_address(address): address for _, address in batch}
+            coordinates = get_cached_coordinates(addresses.values())
+
+            missing_addresses = [address for key, address in addresses.items() if key not in coordinates]
+            for address, (answered, found) in zip(missing_addresses, executor.map(fetch, missing_addresses)):
+                if answered:
+                    found = save_coordinates(address, found)
+                coordinates[normalize_address(address)] = found
+
+            objects = []
+            for pk, address in batch:
+                found = coordinates[normalize_address(address)]
+                if found:
+                    lon, lat = found
+                    objects.append(model(pk=pk, longitude=lon, latitude=lat))
+            self.save(model, objects)
+
+            processed += len(batch)
+            resolved += len(objects)
+            elapsed = time.monotonic() - started_at
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обработано {processed}, найдено {resolved}, '
+                f'{processed / elapsed:.1f} записей/с, последний id {batch[-1][0]}'
+            )
+
+        if not processed:
+            self.stdout.write(f'{model._meta.verbose_name_plural}: нечего заполнять')
+        return resolved
+
+    def save(self, model, objects):
+        # bulk_update sends no signals, so refresh the order candidates and the restaurant grid ourselves.
+        if model is Order:
+            Order.objects.bulk_update(objects, ['longitude', 'latitude'])
+            refresh_order_candidates(Order.objects.filter(pk__in=[order.pk for order in objects]))
+        else:
+            model.objects.bulk_update(objects, ['longitude', 'latitude'])
+            bump_version(RESTAURANTS_VERSION)
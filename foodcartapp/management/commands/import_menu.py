@@ -0,0 +1,47 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.menu_import import FORMATS, IMPORT_CHUNK_SIZE, MenuImportError, import_menu, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Загружает товары, категории и меню ресторанов из CSV или NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для загрузки, «-» — читать из stdin')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла. По умолчанию определяется по расширению',
+        )
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, path, format, chunk_size, **options):
+        file_format = format or Path(path).suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Не удалось определить формат файла, укажите --format: {", ".join(FORMATS)}')
+
+        started_at = time.monotonic()
+
+        def progress(rows):
+            elapsed = time.monotonic() - started_at
+            self.stdout.write(f'Обработано {rows} строк, {rows / elapsed:.1f} строк/с')
+
+        lines = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            stats = import_menu(read_rows(lines, file_format), chunk_size=chunk_size, progress=progress)
+        except MenuImportError as error:
+            raise CommandError(error)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+        for line_number, message in stats['error_samples']:
+            self.stderr.write(f'Строка {line_number}: {message}')
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            f'Загружено {stats["imported"]} из {stats["rows"]} строк, ошибок {stats["errors"]}, '
+            f'{stats["rows"] / elapsed:.1f} строк/с'
+        )
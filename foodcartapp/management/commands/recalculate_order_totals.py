@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённую стоимость заказов по их позициям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только найти заказы с неверной стоимостью, ничего не меняя',
+        )
+
+    def handle(self, *args, check, **options):
+        mismatched_orders = (
+            Order.objects
+            .get_total_cost()
+            .exclude(total_cost=F('calculated_total_cost'))
+            .values_list('pk', 'total_cost', 'calculated_total_cost')
+        )
+        if check:
+            mismatches = 0
+            for pk, stored, calculated in mismatched_orders.iterator():
+                mismatches += 1
+                self.stdout.write(f'Заказ {pk}: сохранено {stored}, по позициям {calculated}')
+            if mismatches:
+                raise CommandError(f'Неверная стоимость у {mismatches} заказов')
+            self.stdout.write('Стоимость всех заказов верна')
+            return
+
+        updated = Order.objects.recalculate_total_cost()
+        self.stdout.write(f'Пересчитана стоимость {updated} заказов')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает у товаров, в скольких ресторанах они в продаже'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только найти товары с неверным счётчиком, ничего не меняя',
+        )
+
+    def handle(self, *args, check, **options):
+        mismatched_products = (
+            Product.objects
+            .get_restaurants_selling()
+            .exclude(restaurants_selling=F('calculated_restaurants_selling'))
+            .values_list('pk', 'restaurants_selling', 'calculated_restaurants_selling')
+        )
+        if check:
+            mismatches = 0
+            for pk, stored, calculated in mismatched_products.iterator():
+                mismatches += 1
+                self.stdout.write(f'Товар {pk}: сохранено {stored}, по меню {calculated}')
+            if mismatches:
+                raise CommandError(f'Неверный счётчик у {mismatches} товаров')
+            self.stdout.write('Счётчики всех товаров верны')
+            return
+
+        updated = Product.objects.recalculate_restaurants_selling()
+        self.stdout.write(f'Пересчитаны счётчики {updated} товаров')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.load import reconcile_loads
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики загрузки ресторанов в кэше с заказами в базе и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только найти расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, check, **options):
+        mismatches = reconcile_loads(fix=not check)
+        for restaurant_id, status, cached, actual in mismatches:
+            self.stdout.write(f'Ресторан {restaurant_id}, статус {status}: в кэше {cached}, в базе {actual}')
+        if check:
+            if mismatches:
+                raise CommandError(f'Разошлись с базой {len(mismatches)} счётчиков')
+            self.stdout.write('Счётчики совпадают с базой')
+            return
+
+        self.stdout.write(f'Исправлено {len(mismatches)} счётчиков')
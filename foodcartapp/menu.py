@@ -0,0 +1,68 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from .availability import MENU_VERSION
+from .cache_versions import bump_version
+from .catalog import CATALOG_VERSION
+from .models import Product, RestaurantMenuItem
+from .tasks import refresh_candidates_on_commit
+
+
+# (restaurant, product) pairs per UPDATE; keeps the OR'ed condition well
+# below database limits on expression depth and query parameters.
+MENU_BATCH_SIZE = 500
+
+
+def get_menu_item_batches(pairs):
+    """Split (restaurant_id, product_id) pairs into RestaurantMenuItem querysets of at most MENU_BATCH_SIZE pairs.
+
+    Pairs are grouped by product, so each queryset filters by one
+    `product_id = … AND restaurant_id IN (…)` condition per product.
+    """
+    restaurants_by_product = defaultdict(set)
+    for restaurant_id, product_id in pairs:
+        restaurants_by_product[product_id].add(restaurant_id)
+
+    conditions, size = [], 0
+    for product_id, restaurant_ids in restaurants_by_product.items():
+        restaurant_ids = sorted(restaurant_ids)
+        for start in range(0, len(restaurant_ids), MENU_BATCH_SIZE):
+            chunk = restaurant_ids[start:start + MENU_BATCH_SIZE]
+            if size + len(chunk) > MENU_BATCH_SIZE:
+                yield RestaurantMenuItem.objects.filter(reduce(or_, conditions))
+                conditions, size = [], 0
+            conditions.append(Q(product_id=product_id, restaurant_id__in=chunk))
+            size += len(chunk)
+    if conditions:
+        yield RestaurantMenuItem.objects.filter(reduce(or_, conditions))
+
+
+@transaction.atomic
+def set_menu_availability(menu_item_batches, available):
+    """Put menu items on or off sale, one UPDATE per RestaurantMenuItem queryset in `menu_item_batches`.
+
+    QuerySet.update sends no signals, so everything the menu item receivers
+    keep in sync is refreshed here once for all batches. Returns the number
+    of menu items that actually changed.
+    """
+    updated, product_ids = 0, set()
+    for menu_items in menu_item_batches:
+        changed = menu_items.exclude(availability=available)
+        product_ids.update(changed.values_list('product_id', flat=True).distinct())
+        updated += changed.update(availability=available)
+    if not updated:
+        return 0
+
+    Product.objects.filter(pk__in=product_ids).recalculate_restaurants_selling()
+
+    def bump_versions():
+        bump_version(MENU_VERSION)
+        bump_version(CATALOG_VERSION)
+
+    transaction.on_commit(bump_versions)
+    refresh_candidates_on_commit(product_ids=product_ids)
+    return updated
@@ -0,0 +1,294 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from .availability import MENU_VERSION
+from .cache_versions import bump_version
+from .catalog import CATALOG_VERSION
+from .models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .tasks import enqueue_all_candidates_refresh
+
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+PRODUCT_COLUMNS = ['category', 'price', 'description', 'special_status', 'image']
+MENU_COLUMNS = ['restaurant', 'availability']
+COLUMNS = ['code', 'product', *PRODUCT_COLUMNS, *MENU_COLUMNS]
+FORMATS = ['csv', 'ndjson']
+
+# Spreadsheets spell booleans in many ways.
+BOOLEANS = {
+    'true': True, 't': True, '1': True, 'yes': True, 'да': True,
+    'false': False, 'f': False, '0': False, 'no': False, 'нет': False,
+}
+
+
+class MenuImportError(ValueError):
+    pass
+
+
+def read_csv_rows(lines):
+    """Yield (line number, row) from CSV text lines; the first line names the columns."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson_rows(lines):
+    """Yield (line number, row) from lines holding one JSON object each."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            row = error
+        yield line_number, row
+
+
+def read_rows(lines, file_format):
+    if file_format not in FORMATS:
+        raise MenuImportError(f'Неизвестный формат {file_format}, поддерживаются: {", ".join(FORMATS)}')
+    return read_csv_rows(lines) if file_format == 'csv' else read_ndjson_rows(lines)
+
+
+def get_ids_by_name(objects):
+    """Return {name: id} of `objects`, None for names several of them share."""
+    ids = {}
+    for object_id, name in objects.values_list('id', 'name'):
+        ids[name] = None if name in ids else object_id
+    return ids
+
+
+def get_restaurant_ids():
+    return get_ids_by_name(Restaurant.objects.all())
+
+
+def get_product_ids(keys, key_column):
+    """Return {code: id} or, without the code column, {name: id} of the products with those keys."""
+    if key_column == 'code':
+        return dict(Product.objects.filter(code__in=keys).values_list('code', 'id'))
+    return get_ids_by_name(Product.objects.filter(name__in=keys))
+
+
+def clean_value(model, field_name, value):
+    field = model._meta.get_field(field_name)
+    if isinstance(value, str):
+        value = value.strip()
+    if value in ('', None) and field.has_default():
+        return field.get_default()
+    if isinstance(field, models.BooleanField) and isinstance(value, str):
+        value = BOOLEANS.get(value.lower(), value)
+    try:
+        return field.clean(value, None)
+    except ValidationError as error:
+        raise ValidationError(f'{field_name}: {" ".join(error.messages)}')
+
+
+def clean_row(row, columns, restaurant_ids):
+    if not isinstance(row, dict):
+        raise ValidationError('строка не является JSON-объектом')
+    cleaned = {}
+    for column in columns:
+        value = row.get(column)
+        if column == 'code':
+            cleaned[column] = clean_value(Product, column, value)
+            if not cleaned[column]:
+                raise ValidationError('code: пустой артикул')
+        elif column == 'product':
+            cleaned[column] = clean_value(Product, 'name', value)
+        elif column == 'category':
+            cleaned[column] = clean_value(ProductCategory, 'name', value) if value else None
+        elif column == 'restaurant':
+            if not isinstance(value, str):
+                raise ValidationError('restaurant: название ресторана должно быть строкой')
+            if restaurant_ids.get(value) is None:
+                problem = 'несколько ресторанов' if value in restaurant_ids else 'нет ресторана'
+                raise ValidationError(f'restaurant: {problem} с названием «{value}»')
+            cleaned[column] = restaurant_ids[value]
+        elif column == 'availability':
+            cleaned[column] = clean_value(RestaurantMenuItem, column, value)
+        elif column == 'image':
+            if value is not None and not isinstance(value, str):
+                raise ValidationError('image: путь к картинке должен быть строкой')
+            cleaned[column] = value or ''
+        else:
+            cleaned[column] = clean_value(Product, column, value)
+    return cleaned
+
+
+def find_categories(names, category_ids):
+    # Category names are not unique, the oldest category of a name is used.
+    categories = ProductCategory.objects.filter(name__in=names).order_by('-id').values_list('name', 'id')
+    category_ids.update(categories)
+
+
+def get_category_ids(names, category_ids):
+    """Add ids of categories named `names` to the `category_ids` cache, creating missing categories."""
+    missing_names = {name for name in names if name and name not in category_ids}
+    if missing_names:
+        find_categories(missing_names, category_ids)
+        new_names = missing_names - category_ids.keys()
+        if new_names:
+            ProductCategory.objects.bulk_create([ProductCategory(name=name) for name in new_names])
+            find_categories(new_names, category_ids)
+    return category_ids
+
+
+def upsert_products(rows, columns, category_ids):
+    """Create or update products from (line number, row) pairs; returns the rows that went in and the errors.
+
+    A new product needs an image, an existing one keeps its image when the
+    row has none.
+    """
+    existing_codes = set(
+        Product.objects
+        .filter(code__in={row['code'] for _, row in rows})
+        .values_list('code', flat=True)
+    )
+    accepted_rows, errors = [], []
+    for line_number, row in rows:
+        if row.get('image') or row['code'] in existing_codes:
+            accepted_rows.append((line_number, row))
+        else:
+            errors.append((line_number, 'image: у нового товара должна быть картинка'))
+
+    if 'category' in columns:
+        get_category_ids([row['category'] for _, row in accepted_rows], category_ids)
+    update_fields = ['name'] + [column for column in columns if column in PRODUCT_COLUMNS and column != 'image']
+    products = {}
+    for _, row in accepted_rows:
+        # A code may repeat within a chunk, the last row wins.
+        products[row['code']] = Product(
+            code=row['code'],
+            name=row['product'],
+            category_id=category_ids.get(row.get('category')),
+            **{column: row[column] for column in columns if column in PRODUCT_COLUMNS and column != 'category'},
+        )
+    for has_image in [True, False]:
+        batch = [product for product in products.values() if bool(product.image) == has_image]
+        if batch:
+            Product.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['code'],
+                update_fields=update_fields + ['image'] if has_image else update_fields,
+            )
+    return accepted_rows, errors
+
+
+def upsert_menu_items(rows, columns):
+    menu_items = {}
+    for row in rows:
+        menu_items[row['restaurant'], row['product_id']] = RestaurantMenuItem(
+            restaurant_id=row['restaurant'],
+            product_id=row['product_id'],
+            availability=row.get('availability', True),
+        )
+    if 'availability' in columns:
+        RestaurantMenuItem.objects.bulk_create(
+            menu_items.values(),
+            update_conflicts=True,
+            unique_fields=['restaurant', 'product'],
+            update_fields=['availability'],
+        )
+    else:
+        # Without the column the file only adds products to menus.
+        RestaurantMenuItem.objects.bulk_create(menu_items.values(), ignore_conflicts=True)
+
+
+@transaction.atomic
+def import_chunk(rows, columns, category_ids):
+    """Upsert one chunk of cleaned rows; returns (line number, message) of rows that were not imported."""
+    errors = []
+    if 'price' in columns:
+        rows, errors = upsert_products(rows, columns, category_ids)
+    key_column = 'code' if 'code' in columns else 'product'
+    product_ids = get_product_ids({row[key_column] for _, row in rows}, key_column)
+    found_rows = []
+    for line_number, row in rows:
+        key = row[key_column]
+        if product_ids.get(key):
+            found_rows.append({**row, 'product_id': product_ids[key]})
+        elif key_column == 'code':
+            errors.append((line_number, f'code: нет товара с артикулом «{key}»'))
+        else:
+            problem = 'несколько товаров' if key in product_ids else 'нет товара'
+            errors.append((line_number, f'product: {problem} с названием «{key}»'))
+    if 'restaurant' in columns:
+        upsert_menu_items(found_rows, columns)
+        Product.objects.filter(pk__in={row['product_id'] for row in found_rows}).recalculate_restaurants_selling()
+    return errors
+
+
+def import_menu(rows, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Upsert products, categories and menu items from (line number, row) pairs, one chunk at a time.
+
+    The columns of the first row decide what is imported. Products are
+    found by their `code`, or by the `product` name when there is no code
+    column. `price` makes products be created or updated by code with their
+    name and whichever of PRODUCT_COLUMNS are present; `restaurant` adds
+    products to the menu of the restaurant with that name, `availability`
+    also puts them on or off sale. Bad rows are skipped and reported.
+    `progress(rows)` is called after every chunk.
+    """
+    rows = iter(rows)
+    first_rows = list(islice(rows, 1))
+    if not first_rows:
+        return {'rows': 0, 'imported': 0, 'errors': 0, 'error_samples': []}
+    _, first_row = first_rows[0]
+    if not isinstance(first_row, dict):
+        raise MenuImportError('Первая строка файла не является JSON-объектом')
+    unknown_columns = set(map(str, first_row)) - set(COLUMNS)
+    if unknown_columns or not {'code', 'product'} & set(first_row):
+        raise MenuImportError(
+            f'Нужна колонка code или product и только колонки из списка: {", ".join(COLUMNS)}. '
+            f'Лишние колонки: {", ".join(sorted(unknown_columns)) or "нет"}'
+        )
+    columns = [column for column in COLUMNS if column in first_row]
+    if 'price' in columns and not {'code', 'product'} <= set(columns):
+        raise MenuImportError('Чтобы создавать и обновлять товары, нужны колонки code и product')
+    if 'availability' in columns and 'restaurant' not in columns:
+        raise MenuImportError('Колонка availability нужна только вместе с restaurant')
+    if set(columns) & set(PRODUCT_COLUMNS) and 'price' not in columns:
+        raise MenuImportError(f'Колонки {", ".join(PRODUCT_COLUMNS)} нужны только вместе с price')
+
+    restaurant_ids = get_restaurant_ids() if 'restaurant' in columns else {}
+    category_ids = {}
+    stats = {'rows': 0, 'imported': 0, 'errors': 0, 'error_samples': []}
+
+    def report_errors(errors):
+        stats['errors'] += len(errors)
+        free = MAX_REPORTED_ERRORS - len(stats['error_samples'])
+        stats['error_samples'].extend(errors[:max(free, 0)])
+
+    chunk = [first_rows[0], *islice(rows, chunk_size - 1)]
+    while chunk:
+        cleaned_rows, errors = [], []
+        for line_number, row in chunk:
+            try:
+                cleaned_rows.append((line_number, clean_row(row, columns, restaurant_ids)))
+            except ValidationError as error:
+                errors.append((line_number, ' '.join(error.messages)))
+        if cleaned_rows:
+            skipped_rows = import_chunk(cleaned_rows, columns, category_ids)
+            stats['imported'] += len(cleaned_rows) - len(skipped_rows)
+            errors.extend(skipped_rows)
+        report_errors(sorted(errors))
+        stats['rows'] += len(chunk)
+        if progress:
+            progress(stats['rows'])
+        chunk = list(islice(rows, chunk_size))
+
+    # bulk_create sends no signals: refresh what the product and menu item receivers keep in sync.
+    if stats['imported']:
+        bump_version(MENU_VERSION)
+        bump_version(CATALOG_VERSION)
+        if 'restaurant' in columns:
+            # In the background, as for restaurant moves: an upload must not wait for every open order.
+            enqueue_all_candidates_refresh()
+    return stats
@@ -0,0 +1,19 @@
+# Generated by Django 4.1 on 2026-10-18 19:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0064_alter_orderproduct_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Стоимость заказа'),
+        ),
+    ]
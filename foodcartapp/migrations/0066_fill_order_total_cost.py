@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_total_cost(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderProduct = apps.get_model('foodcartapp', 'OrderProduct')
+    order_totals = (
+        OrderProduct.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum(F('price') * F('quantity'), output_field=DecimalField()))
+        .values('total')
+    )
+    Order.objects.update(
+        total_cost=Coalesce(Subquery(order_totals), 0, output_field=DecimalField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0065_order_total_cost'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_total_cost, migrations.RunPython.noop),
+    ]
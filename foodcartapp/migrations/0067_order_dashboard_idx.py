@@ -0,0 +1,17 @@
+# Generated by Django 4.1 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0066_fill_order_total_cost'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-status', 'registered_at', 'id'], name='order_dashboard_idx'),
+        ),
+    ]
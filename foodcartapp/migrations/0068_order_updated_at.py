@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0067_order_dashboard_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Время последнего изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at', 'id'], name='order_feed_idx'),
+        ),
+    ]
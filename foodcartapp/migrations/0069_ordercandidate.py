@@ -0,0 +1,36 @@
+# Generated by Django 4.1 on 2026-10-18 19:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0068_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderCandidate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.DecimalField(decimal_places=3, max_digits=8, verbose_name='Расстояние до заказа, км')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место среди ближайших ресторанов')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='foodcartapp.order', verbose_name='Заказ')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_candidates', to='foodcartapp.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'ресторан, который может приготовить заказ',
+                'verbose_name_plural': 'рестораны, которые могут приготовить заказ',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ordercandidate',
+            index=models.Index(fields=['order', 'rank'], name='order_candidate_rank_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ordercandidate',
+            unique_together={('order', 'restaurant')},
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1 on 2026-10-18 19:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0069_ordercandidate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSlaBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('metric', models.CharField(choices=[('call', 'Время до звонка'), ('delivery', 'Время до доставки')], max_length=10, verbose_name='Показатель')),
+                ('upper_minutes', models.PositiveIntegerField(verbose_name='Не дольше, минут')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sla_buckets', to='foodcartapp.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'корзина гистограммы SLA',
+                'verbose_name_plural': 'гистограммы SLA',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('NP', 'Not processed'), ('CK', 'Cooking'), ('DL', 'Delivering'), ('CP', 'Completed')], max_length=13, verbose_name='Прежний статус')),
+                ('to_status', models.CharField(choices=[('NP', 'Not processed'), ('CK', 'Cooking'), ('DL', 'Delivering'), ('CP', 'Completed')], max_length=13, verbose_name='Новый статус')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время события')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='foodcartapp.order', verbose_name='Заказ')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_events', to='foodcartapp.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'событие заказа',
+                'verbose_name_plural': 'события заказов',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderslabucket',
+            index=models.Index(fields=['hour', 'restaurant'], name='order_sla_hour_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderslabucket',
+            unique_together={('restaurant', 'hour', 'metric', 'upper_minutes')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0070_order_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='restaurants_selling',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='в продаже в ресторанах'),
+        ),
+    ]
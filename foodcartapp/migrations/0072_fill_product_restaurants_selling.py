@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_restaurants_selling(apps, schema_editor):
+    Product = apps.get_model('foodcartapp', 'Product')
+    RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+    restaurants_selling = (
+        RestaurantMenuItem.objects
+        .filter(product=OuterRef('pk'), availability=True)
+        .values('product')
+        .annotate(restaurants=Count('pk'))
+        .values('restaurants')
+    )
+    Product.objects.update(
+        restaurants_selling=Coalesce(Subquery(restaurants_selling), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0071_product_restaurants_selling'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_restaurants_selling, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0072_fill_product_restaurants_selling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='code',
+            field=models.CharField(blank=True, help_text='По нему товар находится при загрузке меню', max_length=50, null=True, unique=True, verbose_name='артикул'),
+        ),
+    ]
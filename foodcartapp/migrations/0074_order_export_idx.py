@@ -0,0 +1,17 @@
+# Generated by Django 4.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0073_product_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['registered_at', 'id'], name='order_export_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models import F, Sum
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -45,12 +46,27 @@ class Restaurant(models.Model):
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
+        return self.filter(restaurants_selling__gt=0)
+
+    def get_restaurants_selling(self):
+        return self.annotate(
+            calculated_restaurants_selling=Count(
+                'menu_items',
+                filter=Q(menu_items__availability=True),
+            )
+        )
+
+    def recalculate_restaurants_selling(self):
+        restaurants_selling = (
             RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
+            .filter(product=OuterRef('pk'), availability=True)
+            .values('product')
+            .annotate(restaurants=Count('pk'))
+            .values('restaurants')
+        )
+        return self.update(
+            restaurants_selling=Coalesce(Subquery(restaurants_selling), 0)
         )
-        return self.filter(pk__in=products)
 
 
 class ProductCategory(models.Model):
@@ -72,6 +88,14 @@ class Product(models.Model):
         'название',
         max_length=50
     )
+    code = models.CharField(
+        'артикул',
+        max_length=50,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='По нему товар находится при загрузке меню',
+    )
     category = models.ForeignKey(
         ProductCategory,
         verbose_name='категория',
@@ -99,6 +123,12 @@ class Product(models.Model):
         max_length=200,
         blank=True,
     )
+    restaurants_selling = models.PositiveIntegerField(
+        'в продаже в ресторанах',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
 
     objects = ProductQuerySet.as_manager()
 
@@ -109,6 +139,16 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Menu item receivers keep the counter with UPDATE … F(); a product
+        # loaded before a menu change must not write its stale copy back.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'restaurants_selling'
+            ]
+        super().save(*args, **kwargs)
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
@@ -142,7 +182,26 @@ class RestaurantMenuItem(models.Model):
 
 class QuerySetManager(models.QuerySet):
     def get_total_cost(self):
-        return self.annotate(total_cost=Sum(F("products__price") * F("products__quantity")))
+        return self.annotate(
+            calculated_total_cost=Coalesce(
+                Sum(F("products__price") * F("products__quantity"), output_field=DecimalField()),
+                0,
+                output_field=DecimalField(),
+            )
+        )
+
+    def recalculate_total_cost(self, **fields):
+        order_totals = (
+            OrderProduct.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(F('price') * F('quantity'), output_field=DecimalField()))
+            .values('total')
+        )
+        return self.update(
+            total_cost=Coalesce(Subquery(order_totals), 0, output_field=DecimalField()),
+            **fields
+        )
 
 
 class Order(models.Model):
@@ -198,6 +257,10 @@ class Order(models.Model):
         'Время регистрации заказа',
         default=timezone.now
     )
+    updated_at = models.DateTimeField(
+        'Время последнего изменения',
+        auto_now=True
+    )
     called_at = models.DateTimeField(
         'Время звонка',
         null=True,
@@ -223,6 +286,14 @@ class Order(models.Model):
         choices=payment_methods
     )
 
+    total_cost = models.DecimalField(
+        'Стоимость заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)]
+    )
+
     latitude = models.DecimalField(
         'широта',
         max_digits=8,
@@ -240,6 +311,13 @@ class Order(models.Model):
 
     objects = QuerySetManager.as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-status', 'registered_at', 'id'], name='order_dashboard_idx'),
+            models.Index(fields=['updated_at', 'id'], name='order_feed_idx'),
+            models.Index(fields=['registered_at', 'id'], name='order_export_idx'),
+        ]
+
     def __str__(self):
         return f"{self.firstname} {self.lastname} {self.address}"
 
@@ -271,3 +349,112 @@ class OrderProduct(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0)]
     )
+
+
+class OrderCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        verbose_name='Заказ',
+        on_delete=models.CASCADE,
+        related_name='candidates'
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='Ресторан',
+        on_delete=models.CASCADE,
+        related_name='order_candidates'
+    )
+    distance_km = models.DecimalField(
+        'Расстояние до заказа, км',
+        max_digits=8,
+        decimal_places=3
+    )
+    rank = models.PositiveSmallIntegerField('Место среди ближайших ресторанов')
+
+    class Meta:
+        verbose_name = 'ресторан, который может приготовить заказ'
+        verbose_name_plural = 'рестораны, которые могут приготовить заказ'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+        indexes = [
+            models.Index(fields=['order', 'rank'], name='order_candidate_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.order_id} - {self.restaurant_id} ({self.distance_km} км)'
+
+
+class OrderEvent(models.Model):
+    order = models.ForeignKey(
+        Order,
+        verbose_name='Заказ',
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    from_status = models.CharField(
+        'Прежний статус',
+        choices=Order.statuses,
+        max_length=13
+    )
+    to_status = models.CharField(
+        'Новый статус',
+        choices=Order.statuses,
+        max_length=13
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='Ресторан',
+        on_delete=models.SET_NULL,
+        related_name='order_events',
+        blank=True,
+        null=True
+    )
+    created_at = models.DateTimeField(
+        'Время события',
+        default=timezone.now,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'событие заказа'
+        verbose_name_plural = 'события заказов'
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f'{self.order_id}: {self.from_status} → {self.to_status}'
+
+
+class OrderSlaBucket(models.Model):
+    metrics = [
+        ('call', 'Время до звонка'),
+        ('delivery', 'Время до доставки'),
+    ]
+
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='Ресторан',
+        on_delete=models.CASCADE,
+        related_name='sla_buckets'
+    )
+    hour = models.DateTimeField('Час')
+    metric = models.CharField(
+        'Показатель',
+        choices=metrics,
+        max_length=10
+    )
+    upper_minutes = models.PositiveIntegerField('Не дольше, минут')
+    orders_count = models.PositiveIntegerField('Заказов', default=0)
+
+    class Meta:
+        verbose_name = 'корзина гистограммы SLA'
+        verbose_name_plural = 'гистограммы SLA'
+        unique_together = [
+            ['restaurant', 'hour', 'metric', 'upper_minutes']
+        ]
+        indexes = [
+            models.Index(fields=['hour', 'restaurant'], name='order_sla_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant_id} {self.hour:%Y-%m-%d %H}:00 {self.metric} ≤ {self.upper_minutes} мин'
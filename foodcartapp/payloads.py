@@ -0,0 +1,61 @@
+import gzip
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_json_payload(data):
+    """Serialize data to compact JSON once and precompress it for every supported encoding."""
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    variants = {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli:
+        variants['br'] = brotli.compress(body)
+    return {
+        'etag': hashlib.sha1(body).hexdigest(),
+        'variants': variants,
+    }
+
+
+def choose_encoding(accept_encoding, available):
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in ['br', 'gzip']:
+        quality = accepted.get(coding, accepted.get('*', 0))
+        if coding in available and quality > 0:
+            return coding
+    return 'identity'
+
+
+def payload_response(request, payload):
+    """Return the best precompressed variant of the payload, or 304 if the client has it."""
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), payload['variants'])
+    # Every encoding is a separate representation, so it gets its own strong ETag.
+    etag = f'"{payload["etag"]}"' if encoding == 'identity' else f'"{payload["etag"]}-{encoding}"'
+
+    response = HttpResponse(payload['variants'][encoding], content_type='application/json')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, public=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
@@ -0,0 +1,220 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .availability import update_availability
+from .cache_versions import bump_version
+from .catalog import CATALOG_VERSION
+from .feed import notify_orders_changed
+from .kitchen import notify_kitchens_changed
+from .load import LOAD_STATUSES, track_load_change
+from .models import Order, OrderProduct, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .spatial import move_restaurant, remove_restaurant
+from .tasks import refresh_candidates_on_commit
+
+
+@receiver(pre_save, sender=RestaurantMenuItem)
+def remember_menu_item_pair(sender, instance, **kwargs):
+    instance.previous_pair = None
+    instance.previous_availability = None
+    if instance.pk:
+        previous = (
+            RestaurantMenuItem.objects
+            .filter(pk=instance.pk)
+            .values_list('restaurant_id', 'product_id', 'availability')
+            .first()
+        )
+        if previous:
+            instance.previous_pair, instance.previous_availability = previous[:2], previous[2]
+
+
+@receiver(pre_save, sender=Restaurant)
+def remember_restaurant_coordinates(sender, instance, **kwargs):
+    instance.previous_coordinates = None
+    if instance.pk:
+        instance.previous_coordinates = (
+            Restaurant.objects
+            .filter(pk=instance.pk)
+            .values_list('latitude', 'longitude')
+            .first()
+        )
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+def update_menu_item_availability(sender, instance, **kwargs):
+    previous_pair = getattr(instance, 'previous_pair', None)
+    restaurant_id, product_id, available = instance.restaurant_id, instance.product_id, instance.availability
+
+    def update():
+        if previous_pair and previous_pair != (restaurant_id, product_id):
+            update_availability(*previous_pair, False)
+        update_availability(restaurant_id, product_id, available)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+def count_restaurants_selling(sender, instance, **kwargs):
+    # Runs inside the saving transaction, so the counter never disagrees with committed menus.
+    previous_pair = getattr(instance, 'previous_pair', None)
+    previous_product_id = previous_pair[1] if previous_pair and instance.previous_availability else None
+    product_id = instance.product_id if instance.availability else None
+    if previous_product_id == product_id:
+        return
+    if previous_product_id:
+        Product.objects.filter(pk=previous_product_id).update(restaurants_selling=F('restaurants_selling') - 1)
+    if product_id:
+        Product.objects.filter(pk=product_id).update(restaurants_selling=F('restaurants_selling') + 1)
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def uncount_restaurants_selling(sender, instance, **kwargs):
+    if instance.availability:
+        Product.objects.filter(pk=instance.product_id).update(restaurants_selling=F('restaurants_selling') - 1)
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def remove_menu_item_availability(sender, instance, **kwargs):
+    restaurant_id, product_id = instance.restaurant_id, instance.product_id
+    transaction.on_commit(lambda: update_availability(restaurant_id, product_id, False))
+
+
+@receiver(post_save, sender=Restaurant)
+def move_restaurant_on_grid(sender, instance, **kwargs):
+    restaurant_id, latitude, longitude = instance.id, instance.latitude, instance.longitude
+    transaction.on_commit(lambda: move_restaurant(restaurant_id, latitude, longitude))
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_restaurant_from_grid(sender, instance, **kwargs):
+    restaurant_id = instance.id
+    transaction.on_commit(lambda: remove_restaurant(restaurant_id))
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def invalidate_catalog(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+
+
+@receiver(pre_save, sender=OrderProduct)
+def remember_order_product_order(sender, instance, **kwargs):
+    instance.previous_order_id = None
+    if instance.pk:
+        instance.previous_order_id = (
+            OrderProduct.objects
+            .filter(pk=instance.pk)
+            .values_list('order_id', flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=OrderProduct)
+def update_order_total_cost(sender, instance, **kwargs):
+    # A line moved to another order changes the total of the order it left too.
+    order_ids = {instance.order_id, getattr(instance, 'previous_order_id', None)} - {None}
+    Order.objects.filter(pk__in=order_ids).recalculate_total_cost(updated_at=timezone.now())
+    notify_orders_changed()
+
+
+@receiver([post_save, post_delete], sender=Order)
+def publish_order_change(sender, **kwargs):
+    notify_orders_changed()
+
+
+def get_load_slot(restaurant_id, status):
+    return (restaurant_id, status) if restaurant_id and status in LOAD_STATUSES else None
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_load_slot(sender, instance, **kwargs):
+    instance.previous_load_slot = None
+    if instance.pk:
+        previous = (
+            Order.objects
+            .filter(pk=instance.pk)
+            .values_list('cooking_restaurant_id', 'status')
+            .first()
+        )
+        if previous:
+            instance.previous_load_slot = get_load_slot(*previous)
+
+
+@receiver(post_save, sender=Order)
+def update_restaurant_load(sender, instance, **kwargs):
+    track_load_change(
+        getattr(instance, 'previous_load_slot', None),
+        get_load_slot(instance.cooking_restaurant_id, instance.status),
+    )
+
+
+@receiver(post_delete, sender=Order)
+def release_restaurant_load(sender, instance, **kwargs):
+    track_load_change(get_load_slot(instance.cooking_restaurant_id, instance.status), None)
+
+
+@receiver(post_save, sender=Order)
+def update_kitchen_queue(sender, instance, **kwargs):
+    previous_slot = getattr(instance, 'previous_load_slot', None)
+    notify_kitchens_changed(
+        previous_slot[0] if previous_slot and previous_slot[1] == 'CK' else None,
+        instance.cooking_restaurant_id if instance.status == 'CK' else None,
+    )
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_kitchen_queue(sender, instance, **kwargs):
+    if instance.status == 'CK':
+        notify_kitchens_changed(instance.cooking_restaurant_id)
+
+
+@receiver([post_save, post_delete], sender=OrderProduct)
+def update_kitchen_order(sender, instance, **kwargs):
+    notify_kitchens_changed(
+        Order.objects
+        .filter(pk=instance.order_id, status='CK')
+        .values_list('cooking_restaurant_id', flat=True)
+        .first()
+    )
+
+
+# Candidates are refreshed after the grid and the availability index above
+# have been updated: on_commit callbacks run in registration order.
+@receiver(post_save, sender=RestaurantMenuItem)
+def refresh_candidates_on_menu_change(sender, instance, created, **kwargs):
+    previous_pair = getattr(instance, 'previous_pair', None)
+    pair = (instance.restaurant_id, instance.product_id)
+    if not created and previous_pair == pair and instance.previous_availability == instance.availability:
+        return
+    product_ids = {instance.product_id}
+    if previous_pair:
+        product_ids.add(previous_pair[1])
+    refresh_candidates_on_commit(product_ids=product_ids)
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def refresh_candidates_on_menu_item_delete(sender, instance, **kwargs):
+    refresh_candidates_on_commit(product_ids=[instance.product_id])
+
+
+@receiver(post_save, sender=Restaurant)
+def refresh_candidates_on_restaurant_move(sender, instance, **kwargs):
+    previous_coordinates = getattr(instance, 'previous_coordinates', None) or (None, None)
+    coordinates = (instance.latitude, instance.longitude)
+    # A restaurant without coordinates before and after, new ones included, was never on the grid.
+    if previous_coordinates == coordinates or (None in previous_coordinates and None in coordinates):
+        return
+    refresh_candidates_on_commit(all_orders=True)
+
+
+@receiver(post_delete, sender=Restaurant)
+def refresh_candidates_on_restaurant_delete(sender, instance, **kwargs):
+    refresh_candidates_on_commit(all_orders=True)
+
+
+@receiver([post_save, post_delete], sender=OrderProduct)
+def refresh_candidates_on_order_change(sender, instance, **kwargs):
+    refresh_candidates_on_commit(order_ids=[instance.order_id])
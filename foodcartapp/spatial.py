@@ -0,0 +1,175 @@
+import heapq
+import math
+
+from django.conf import settings
+
+from .availability import get_availability_index
+from .cache_versions import VersionedIndex
+from .geo import EARTH_RADIUS_KM, haversine_matrix, to_radians
+from .models import Restaurant
+
+
+RESTAURANTS_VERSION = 'restaurants'
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class RestaurantGrid:
+    """Restaurants bucketed into square lat/lon cells for nearest-neighbour search."""
+
+    def __init__(self, restaurants, cell_size=None):
+        self.cell_size = cell_size or settings.RESTAURANT_GRID_CELL_DEGREES
+        self.cells = {}
+        self.positions = {}
+        self.bounds = None
+        self.all_coordinates = None
+        for restaurant_id, latitude, longitude in restaurants:
+            self.move(restaurant_id, latitude, longitude)
+
+    @classmethod
+    def build(cls):
+        restaurants = (
+            Restaurant.objects
+            .filter(latitude__isnull=False, longitude__isnull=False)
+            .values_list('id', 'latitude', 'longitude')
+        )
+        return cls(restaurants)
+
+    def get_cell(self, latitude, longitude):
+        return (
+            math.floor(float(latitude) / self.cell_size),
+            math.floor(float(longitude) / self.cell_size),
+        )
+
+    def move(self, restaurant_id, latitude, longitude):
+        self.remove(restaurant_id)
+        if latitude is None or longitude is None:
+            return
+        cell = self.get_cell(latitude, longitude)
+        self.bounds = self.all_coordinates = None
+        self.cells.setdefault(cell, set()).add(restaurant_id)
+        self.positions[restaurant_id] = (float(latitude), float(longitude), cell)
+
+    def remove(self, restaurant_id):
+        position = self.positions.pop(restaurant_id, None)
+        if not position:
+            return
+        cell = position[2]
+        self.bounds = self.all_coordinates = None
+        self.cells[cell].discard(restaurant_id)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def get_bounds(self):
+        if self.bounds is None:
+            rows = [cell[0] for cell in self.cells]
+            columns = [cell[1] for cell in self.cells]
+            self.bounds = min(rows), max(rows), min(columns), max(columns)
+        return self.bounds
+
+    def iter_ring(self, center, radius):
+        row, column = center
+        if not radius:
+            yield center
+            return
+        for offset in range(-radius, radius + 1):
+            yield row - radius, column + offset
+            yield row + radius, column + offset
+        for offset in range(-radius + 1, radius):
+            yield row + offset, column - radius
+            yield row + offset, column + radius
+
+    def get_ring_clearance(self, latitude, radius):
+        """Lower bound, in km, on the distance to any cell beyond `radius` rings."""
+        farthest_latitude = min(abs(latitude) + (radius + 1) * self.cell_size, 90)
+        narrowest_cell = self.cell_size * KM_PER_DEGREE * math.cos(math.radians(farthest_latitude))
+        # A little slack: great circles are slightly shorter than parallels.
+        return radius * narrowest_cell * 0.99
+
+    def get_all_coordinates(self):
+        if self.all_coordinates is None:
+            restaurant_ids = list(self.positions)
+            self.all_coordinates = restaurant_ids, to_radians([
+                self.positions[restaurant_id][:2] for restaurant_id in restaurant_ids
+            ])
+        return self.all_coordinates
+
+    def scan(self, origin, k, is_eligible=None):
+        """Rank every restaurant in one vectorized pass."""
+        restaurant_ids, coordinates = self.get_all_coordinates()
+        distances = haversine_matrix(origin, coordinates)[0]
+        if is_eligible:
+            eligible = is_eligible(restaurant_ids)
+            ranked = zip(distances.tolist(), restaurant_ids, eligible)
+            ranked = [(km, restaurant_id) for km, restaurant_id, ok in ranked if ok]
+        else:
+            ranked = zip(distances.tolist(), restaurant_ids)
+        return [(restaurant_id, km) for km, restaurant_id in heapq.nsmallest(k, ranked)]
+
+    def nearest(self, latitude, longitude, k, is_eligible=None):
+        """Return up to `k` (restaurant_id, km) pairs sorted by distance.
+
+        `is_eligible` receives a list of restaurant ids and returns a boolean
+        mask of those that may be offered.
+        """
+        if not self.positions:
+            return []
+        latitude, longitude = float(latitude), float(longitude)
+        origin = to_radians([(latitude, longitude)])
+        center = self.get_cell(latitude, longitude)
+        min_row, max_row, min_column, max_column = self.get_bounds()
+        max_radius = max(
+            center[0] - min_row, max_row - center[0],
+            center[1] - min_column, max_column - center[1],
+        )
+
+        best = []
+        for radius in range(max_radius + 1):
+            if (2 * radius + 1) ** 2 > len(self.cells):
+                # Mostly empty cells from here on, e.g. when fewer than `k`
+                # restaurants are eligible: rank everything at once instead.
+                return self.scan(origin, k, is_eligible)
+            ring_ids = [
+                restaurant_id
+                for cell in self.iter_ring(center, radius)
+                for restaurant_id in self.cells.get(cell, ())
+            ]
+            if ring_ids and is_eligible:
+                ring_ids = [
+                    restaurant_id
+                    for restaurant_id, eligible in zip(ring_ids, is_eligible(ring_ids))
+                    if eligible
+                ]
+            if ring_ids:
+                ring_coordinates = to_radians([self.positions[restaurant_id][:2] for restaurant_id in ring_ids])
+                distances = haversine_matrix(origin, ring_coordinates)[0]
+                for restaurant_id, km in zip(ring_ids, distances.tolist()):
+                    heapq.heappush(best, (km, restaurant_id))
+            if len(best) >= k and heapq.nsmallest(k, best)[-1][0] <= self.get_ring_clearance(latitude, radius):
+                break
+
+        return [(restaurant_id, km) for km, restaurant_id in heapq.nsmallest(k, best)]
+
+
+restaurant_grid = VersionedIndex(RESTAURANTS_VERSION, RestaurantGrid.build)
+
+
+def move_restaurant(restaurant_id, latitude, longitude):
+    restaurant_grid.apply(lambda grid: grid.move(restaurant_id, latitude, longitude))
+
+
+def remove_restaurant(restaurant_id):
+    restaurant_grid.apply(lambda grid: grid.remove(restaurant_id))
+
+
+def nearest_restaurants(lat, lon, k, product_ids=None):
+    """Return up to `k` (restaurant_id, km) pairs nearest to the point that can cook all `product_ids`."""
+    is_eligible = None
+    if product_ids is not None:
+        availability = get_availability_index()
+        product_ids = set(product_ids)
+
+        def is_eligible(restaurant_ids):
+            return availability.eligibility_matrix([product_ids], restaurant_ids)[0]
+
+    return restaurant_grid.get().nearest(lat, lon, k, is_eligible)
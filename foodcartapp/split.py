@@ -0,0 +1,138 @@
+import numpy as np
+
+from .availability import get_availability_index
+from .geo import haversine_matrix, to_radians
+from .spatial import restaurant_grid
+
+
+def count_bits(mask):
+    return bin(mask).count('1')
+
+
+def prune_options(masks, distances, full_mask):
+    """Return (mask, index) options worth considering, nearest first.
+
+    An option is dropped when a nearer (or equally near) one sells a
+    superset of the order's products it sells.
+    """
+    nearest_by_mask = {}
+    for index, (mask, km) in enumerate(zip(masks, distances)):
+        mask &= full_mask
+        if mask and (mask not in nearest_by_mask or km < distances[nearest_by_mask[mask]]):
+            nearest_by_mask[mask] = index
+
+    options = []
+    for mask, index in sorted(nearest_by_mask.items(), key=lambda option: distances[option[1]]):
+        if not any(mask & kept_mask == mask for kept_mask, _ in options):
+            options.append((mask, index))
+    return options
+
+
+def greedy_cover(options, distances, full_mask):
+    covered, chosen, km = 0, [], 0.0
+    while covered != full_mask:
+        mask, index = max(
+            options,
+            key=lambda option: (count_bits(option[0] & ~covered), -distances[option[1]]),
+        )
+        if not mask & ~covered:
+            return None
+        covered |= mask
+        chosen.append(index)
+        km += distances[index]
+    return len(chosen), km, chosen
+
+
+def plan_cover(masks, distances, full_mask):
+    """Choose options whose bitset `masks` together cover `full_mask`.
+
+    Fewest options win, ties are broken by the smallest total distance.
+    Branch and bound over the uncovered bit with the fewest options,
+    starting from the greedy cover and pruning by a lower bound on how many
+    more options are needed. Returns option indices or None if no cover exists.
+    """
+    options = prune_options(masks, distances, full_mask)
+    union = 0
+    for mask, _ in options:
+        union |= mask
+    if union != full_mask:
+        return None
+
+    bits = [1 << position for position in range(full_mask.bit_length()) if full_mask >> position & 1]
+    options_by_bit = {bit: [option for option in options if option[0] & bit] for bit in bits}
+    widest = max(count_bits(mask) for mask, _ in options)
+    nearest_km = distances[options[0][1]]
+    best = greedy_cover(options, distances, full_mask)
+
+    def search(covered, chosen, km):
+        nonlocal best
+        uncovered = full_mask & ~covered
+        if not uncovered:
+            if (len(chosen), km) < best[:2]:
+                best = len(chosen), km, list(chosen)
+            return
+
+        still_needed = -(-count_bits(uncovered) // widest)
+        count_bound = len(chosen) + still_needed
+        if (count_bound, km + still_needed * nearest_km) >= best[:2]:
+            return
+
+        branch_bit = min(
+            (bit for bit in bits if uncovered & bit),
+            key=lambda bit: len(options_by_bit[bit]),
+        )
+        for mask, index in options_by_bit[branch_bit]:
+            chosen.append(index)
+            search(covered | mask, chosen, km + distances[index])
+            chosen.pop()
+
+    search(0, [], 0.0)
+    return best[2]
+
+
+def plan_split_order(product_ids, latitude, longitude):
+    """Split an order between the fewest and then the nearest restaurants that together sell all its products.
+
+    Returns [(restaurant_id, km, product_ids)] or None when some product is
+    sold nowhere or the order has no coordinates.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids or latitude is None or longitude is None:
+        return None
+    availability = get_availability_index()
+    if any(product_id not in availability.product_columns for product_id in product_ids):
+        return None
+
+    positions = restaurant_grid.get().positions
+    restaurant_ids = [
+        restaurant_id for restaurant_id in availability.restaurant_rows
+        if restaurant_id in positions
+    ]
+    if not restaurant_ids:
+        return None
+    columns = [availability.product_columns[product_id] for product_id in product_ids]
+    selling = availability.matrix[availability.get_rows(restaurant_ids)][:, columns]
+    sells_any = selling.any(axis=1)
+    restaurant_ids = [restaurant_id for restaurant_id, ok in zip(restaurant_ids, sells_any) if ok]
+    packed = np.packbits(selling[sells_any], axis=1, bitorder='little')
+    masks = [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+    distances = haversine_matrix(
+        to_radians([(latitude, longitude)]),
+        to_radians([positions[restaurant_id][:2] for restaurant_id in restaurant_ids]),
+    )[0].tolist()
+
+    chosen = plan_cover(masks, distances, (1 << len(product_ids)) - 1)
+    if chosen is None:
+        return None
+
+    # Every product goes to the nearest chosen restaurant that sells it.
+    plan = {index: [] for index in sorted(chosen, key=lambda index: distances[index])}
+    for position, product_id in enumerate(product_ids):
+        index = next(index for index in plan if masks[index] >> position & 1)
+        plan[index].append(product_id)
+    return [
+        (restaurant_ids[index], distances[index], plan_product_ids)
+        for index, plan_product_ids in plan.items()
+        if plan_product_ids
+    ]
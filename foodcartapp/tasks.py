@@ -0,0 +1,141 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from places.geocoder import GeocoderUnavailable, get_coordinates
+
+from .candidates import refresh_order_candidates
+from .models import Order
+
+
+logger = logging.getLogger(__name__)
+
+geocoding_executor = ThreadPoolExecutor(
+    max_workers=settings.GEOCODER_WORKERS,
+    thread_name_prefix='geocoder',
+)
+geocoding_slots = threading.BoundedSemaphore(settings.GEOCODER_QUEUE_SIZE)
+queued_order_ids = set()
+queued_order_ids_lock = threading.Lock()
+
+# One worker: full recomputes run one at a time and a queued one covers all later requests.
+candidates_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='candidates')
+candidates_refresh_queued = threading.Event()
+candidates_refresh_lock = threading.Lock()
+
+
+class PendingCandidatesRefresh(threading.local):
+    """What the current thread's transaction asked to refresh; a transaction runs in one thread."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.order_ids = set()
+        self.product_ids = set()
+        self.all_orders = False
+        self.requests = 0
+
+
+pending_candidates_refresh = PendingCandidatesRefresh()
+
+
+def geocode_order(order_id):
+    close_old_connections()
+    try:
+        address = Order.objects.filter(pk=order_id).values_list('address', flat=True).first()
+        if address is None:
+            return
+        coordinates = get_coordinates(address)
+        if not coordinates:
+            return
+        lon, lat = coordinates
+        Order.objects.filter(pk=order_id).update(longitude=lon, latitude=lat, updated_at=timezone.now())
+        refresh_order_candidates(Order.objects.filter(pk=order_id))
+    except GeocoderUnavailable:
+        logger.warning('Не удалось определить координаты заказа %s', order_id, exc_info=True)
+    except Exception:
+        # Nobody waits for the worker's result, so log the error here or it is lost.
+        logger.exception('Ошибка при геокодировании заказа %s', order_id)
+    finally:
+        close_old_connections()
+        with queued_order_ids_lock:
+            queued_order_ids.discard(order_id)
+        geocoding_slots.release()
+
+
+def enqueue_order_geocoding(order_id):
+    """Geocode the order in a worker thread unless it is queued already.
+
+    If the queue is full the order is skipped; the dashboard enqueues it
+    again the next time it shows the order without coordinates.
+    """
+    with queued_order_ids_lock:
+        if order_id in queued_order_ids:
+            return
+        if not geocoding_slots.acquire(blocking=False):
+            logger.warning('Очередь геокодера переполнена, заказ %s пропущен', order_id)
+            return
+        queued_order_ids.add(order_id)
+    geocoding_executor.submit(geocode_order, order_id)
+
+
+def refresh_all_candidates():
+    candidates_refresh_queued.clear()
+    close_old_connections()
+    try:
+        refresh_order_candidates(Order.objects.filter(status='NP'))
+    except Exception:
+        logger.exception('Ошибка при пересчёте ближайших ресторанов заказов')
+    finally:
+        close_old_connections()
+
+
+def enqueue_all_candidates_refresh():
+    """Recompute candidates of all open orders in a worker thread, unless a recompute is queued already."""
+    with candidates_refresh_lock:
+        if candidates_refresh_queued.is_set():
+            return
+        candidates_refresh_queued.set()
+    candidates_executor.submit(refresh_all_candidates)
+
+
+def refresh_candidates_on_commit(order_ids=(), product_ids=(), all_orders=False):
+    """Refresh candidates once the transaction commits.
+
+    `order_ids` are refreshed, so are open orders with any of `product_ids`,
+    and with `all_orders` every open order, in a worker thread. Requests of
+    one transaction are merged and carried out once, by the callback of the
+    last request: on_commit callbacks run in registration order, so by then
+    the restaurant grid and the availability index are up to date.
+    Requests of a rolled back transaction are carried out with the next
+    one, which costs a needless but harmless refresh.
+    """
+    pending = pending_candidates_refresh
+    pending.order_ids.update(order_ids)
+    pending.product_ids.update(product_ids)
+    pending.all_orders |= all_orders
+    pending.requests += 1
+    request = pending.requests
+    transaction.on_commit(lambda: flush_candidates_refresh(request))
+
+
+def flush_candidates_refresh(request):
+    pending = pending_candidates_refresh
+    if request != pending.requests:
+        return
+    order_ids, product_ids, all_orders = pending.order_ids, pending.product_ids, pending.all_orders
+    pending.reset()
+    if all_orders:
+        enqueue_all_candidates_refresh()
+    if order_ids or product_ids:
+        refresh_order_candidates(
+            Order.objects
+            .filter(Q(id__in=order_ids) | Q(status='NP', products__product_id__in=product_ids))
+            .distinct()
+        )
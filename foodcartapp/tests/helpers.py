@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from foodcartapp.models import Order
+from foodcartapp.tasks import pending_candidates_refresh
+
+
+def create_order(**fields):
+    return Order.objects.create(**{
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79001234567',
+        'address': 'Москва, Тверская, 1',
+        'payment_method': 'CS',
+        **fields,
+    })
+
+
+class FoodcartTestCase(TestCase):
+    """Starts from an empty cache and keeps background work out of the test database.
+
+    Process-wide indexes are rebuilt for the fresh cache versions. Worker
+    threads would not see the test transaction, so queueing them is mocked:
+    `enqueue_all_candidates_refresh` and `enqueue_order_geocoding`. Test
+    transactions never commit, so candidate refreshes they asked for are
+    dropped after each test.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.enqueue_all_candidates_refresh = self.patch_everywhere('enqueue_all_candidates_refresh', [
+            'foodcartapp.tasks',
+            'foodcartapp.menu_import',
+        ])
+        self.enqueue_order_geocoding = self.patch_everywhere('enqueue_order_geocoding', [
+            'foodcartapp.views',
+            'restaurateur.views',
+        ])
+        self.addCleanup(pending_candidates_refresh.reset)
+
+    def patch_everywhere(self, name, modules):
+        """Replace `name` with one mock in every module that imported it."""
+        replacement = mock.Mock()
+        for module in modules:
+            patcher = mock.patch(f'{module}.{name}', replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return replacement
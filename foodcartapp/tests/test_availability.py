@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from foodcartapp.availability import MENU_VERSION, AvailabilityIndex, availability_index, get_availability_index
+from foodcartapp.cache_versions import bump_version
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase
+
+
+class AvailabilityIndexTest(SimpleTestCase):
+    def setUp(self):
+        # Restaurant 1 sells products 10 and 20, restaurant 2 only 10.
+        self.index = AvailabilityIndex([(1, 10), (1, 20), (2, 10)])
+
+    def test_restaurants_selling_every_product(self):
+        self.assertEqual(self.index.restaurants_for({10}, [1, 2, 3]), [1, 2])
+        self.assertEqual(self.index.restaurants_for({10, 20}, [1, 2, 3]), [1])
+        # Nobody sells product 30.
+        self.assertEqual(self.index.restaurants_for({10, 30}, [1, 2, 3]), [])
+
+    def test_eligibility_matrix(self):
+        eligible = self.index.eligibility_matrix([{10}, {20}, set()], [2, 1])
+
+        self.assertEqual(eligible.tolist(), [[True, True], [False, True], [True, True]])
+
+    def test_product_matrix(self):
+        available = self.index.product_matrix([20, 10, 30], [1, 2, 3])
+
+        self.assertEqual(available.tolist(), [
+            [True, False, False],
+            [True, True, False],
+            [False, False, False],
+        ])
+
+    def test_set_availability_adds_and_removes(self):
+        self.index.set_availability(3, 30, True)
+        self.index.set_availability(1, 20, False)
+        # Taking off sale what was never indexed changes nothing.
+        self.index.set_availability(4, 40, False)
+
+        self.assertEqual(self.index.restaurants_for({30}, [1, 2, 3, 4]), [3])
+        self.assertEqual(self.index.restaurants_for({20}, [1, 2, 3, 4]), [])
+        self.assertNotIn(4, self.index.restaurant_rows)
+
+
+class AvailabilityIndexCacheTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(name='Ресторан')
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+
+    def test_committed_menu_change_updates_index_in_place(self):
+        index = get_availability_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=self.product)
+
+        with mock.patch.object(availability_index, 'build') as build:
+            self.assertEqual(get_availability_index().restaurants_for({self.product.id}, [self.restaurant.id]), [
+                self.restaurant.id,
+            ])
+        build.assert_not_called()
+        self.assertIs(get_availability_index(), index)
+
+    def test_uncommitted_menu_change_is_not_indexed(self):
+        get_availability_index()
+        with self.captureOnCommitCallbacks(execute=False):
+            RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=self.product)
+
+        self.assertEqual(get_availability_index().restaurants_for({self.product.id}, [self.restaurant.id]), [])
+
+    def test_version_bumped_elsewhere_rebuilds_index(self):
+        get_availability_index()
+        # A change committed by another process: the row is there, only the version moved.
+        RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=self.product)
+        bump_version(MENU_VERSION)
+
+        self.assertEqual(get_availability_index().restaurants_for({self.product.id}, [self.restaurant.id]), [
+            self.restaurant.id,
+        ])
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.candidates import refresh_order_candidates
+from foodcartapp.models import Order, OrderCandidate, OrderProduct, Product, Restaurant, RestaurantMenuItem
+from foodcartapp.tasks import pending_candidates_refresh
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class CandidatesTestCase(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        self.near = Restaurant.objects.create(name='Ближний', latitude=55.75, longitude=37.61)
+        self.far = Restaurant.objects.create(name='Дальний', latitude=55.85, longitude=37.61)
+        for restaurant in [self.near, self.far]:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=self.product)
+        self.order = create_order(latitude=55.76, longitude=37.61)
+        # Test transactions never commit: drop what the fixtures asked to refresh.
+        pending_candidates_refresh.reset()
+
+    def get_ranking(self):
+        return list(
+            OrderCandidate.objects
+            .filter(order=self.order)
+            .order_by('rank')
+            .values_list('restaurant__name', flat=True)
+        )
+
+
+class RefreshCandidatesTest(CandidatesTestCase):
+    def test_order_gets_restaurants_ranked_by_distance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderProduct.objects.create(order=self.order, product=self.product, price=100)
+
+        self.assertEqual(self.get_ranking(), ['Ближний', 'Дальний'])
+
+    def test_menu_change_drops_restaurant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderProduct.objects.create(order=self.order, product=self.product, price=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(restaurant=self.near).get().delete()
+
+        self.assertEqual(self.get_ranking(), ['Дальний'])
+
+    def test_orders_with_unchanged_candidates_are_left_alone(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderProduct.objects.create(order=self.order, product=self.product, price=100)
+        cooked_order = create_order(address='Москва, Арбат, 1', status='CK')
+        updated_at = timezone.now() - timedelta(hours=1)
+        Order.objects.update(updated_at=updated_at)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            refresh_order_candidates(Order.objects.all())
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(set(Order.objects.values_list('updated_at', flat=True)), {updated_at})
+        self.assertEqual(self.get_ranking(), ['Ближний', 'Дальний'])
+        self.assertFalse(OrderCandidate.objects.filter(order=cooked_order).exists())
+
+    def test_refreshes_of_one_transaction_are_merged(self):
+        other_product = Product.objects.create(name='Картошка', price=50, image='fries.jpg')
+        with mock.patch('foodcartapp.tasks.refresh_order_candidates') as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                OrderProduct.objects.create(order=self.order, product=self.product, price=100)
+                OrderProduct.objects.create(order=self.order, product=other_product, price=50)
+                RestaurantMenuItem.objects.create(restaurant=self.near, product=other_product)
+
+        refresh.assert_called_once()
+
+    def test_restaurant_move_recomputes_all_orders_in_background(self):
+        with mock.patch('foodcartapp.tasks.refresh_order_candidates') as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.near.latitude = 55.9
+                self.near.save()
+                self.far.latitude = 55.7
+                self.far.save()
+
+        self.enqueue_all_candidates_refresh.assert_called_once_with()
+        refresh.assert_not_called()
+
+    def test_restaurant_without_coordinates_recomputes_nothing(self):
+        with mock.patch('foodcartapp.tasks.refresh_order_candidates') as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            restaurant = Restaurant.objects.create(name='Без адреса')
+            restaurant.name = 'Всё ещё без адреса'
+            restaurant.save()
+
+        self.enqueue_all_candidates_refresh.assert_not_called()
+        refresh.assert_not_called()
+
+    def test_new_restaurant_with_coordinates_recomputes_all_orders(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Restaurant.objects.create(name='Новый', latitude=55.76, longitude=37.61)
+
+        self.enqueue_all_candidates_refresh.assert_called_once_with()
@@ -0,0 +1,63 @@
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase
+
+
+class ProductListApiTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(name='Ресторан')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+            RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=self.product)
+
+    def get_products(self, **headers):
+        return self.client.get('/api/products/', **headers)
+
+    def get_names(self, response):
+        return [product['name'] for product in response.json()]
+
+    def test_snapshot_is_served_from_cache(self):
+        self.get_products()
+
+        with self.assertNumQueries(0):
+            response = self.get_products()
+
+        self.assertEqual(self.get_names(response), ['Чизбургер'])
+
+    def test_unchanged_catalog_is_not_modified(self):
+        etag = self.get_products()['ETag']
+
+        response = self.get_products(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_committed_change_invalidates_snapshot(self):
+        etag = self.get_products()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Двойной чизбургер'
+            self.product.save()
+
+        response = self.get_products(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get_names(response), ['Двойной чизбургер'])
+
+    def test_snapshot_is_kept_until_commit(self):
+        self.get_products()
+        with self.captureOnCommitCallbacks(execute=False):
+            self.product.name = 'Двойной чизбургер'
+            self.product.save()
+
+        self.assertEqual(self.get_names(self.get_products()), ['Чизбургер'])
+
+    def test_product_taken_off_sale_leaves_catalog(self):
+        self.get_products()
+        menu_item = RestaurantMenuItem.objects.get(product=self.product)
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.availability = False
+            menu_item.save()
+
+        self.assertEqual(self.get_names(self.get_products()), [])
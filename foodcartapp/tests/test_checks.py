@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase, override_settings
+
+from foodcartapp.checks import check_shared_cache
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_process_local_cache_fails_in_production(self):
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['foodcartapp.E001'])
+
+    @override_settings(DEBUG=False, CACHES=REDIS)
+    def test_redis_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM)
+    def test_process_local_cache_is_fine_for_development(self):
+        self.assertEqual(check_shared_cache(None), [])
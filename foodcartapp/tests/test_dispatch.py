@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from foodcartapp import dispatch
+from foodcartapp.dispatch import dispatch_orders
+from foodcartapp.load import get_restaurant_loads
+from foodcartapp.models import Order, OrderProduct, Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase, create_order
+
+
+@override_settings(RESTAURANT_CAPACITY=2)
+class DispatchOrdersTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        self.near = Restaurant.objects.create(name='Ближний', latitude=55.75, longitude=37.61)
+        self.far = Restaurant.objects.create(name='Дальний', latitude=55.85, longitude=37.61)
+        for restaurant in [self.near, self.far]:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        self.orders = []
+        for _ in range(3):
+            order = create_order(latitude=55.75, longitude=37.61)
+            OrderProduct.objects.create(order=order, product=product, price=100)
+            self.orders.append(order)
+
+    def get_assigned(self):
+        return dict(Order.objects.filter(cooking_restaurant__isnull=False).values_list('id', 'cooking_restaurant_id'))
+
+    def test_respects_restaurant_capacity(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            assignments = dispatch_orders()
+
+        restaurant_ids = [restaurant_id for _, restaurant_id, _ in assignments]
+        self.assertEqual(sorted(restaurant_ids), sorted([self.near.id, self.near.id, self.far.id]))
+        self.assertEqual(self.get_assigned(), {order_id: restaurant_id for order_id, restaurant_id, _ in assignments})
+        loads = get_restaurant_loads([self.near.id, self.far.id])
+        self.assertEqual((loads[self.near.id]['NP'], loads[self.far.id]['NP']), (2, 1))
+
+    def test_busy_restaurant_gets_no_more_orders(self):
+        busy_order = self.orders.pop()
+        busy_order.cooking_restaurant = self.near
+        busy_order.save()
+        cache.clear()
+
+        assignments = dispatch_orders()
+
+        self.assertEqual(
+            sorted(restaurant_id for _, restaurant_id, _ in assignments),
+            sorted([self.near.id, self.far.id]),
+        )
+
+    def test_order_assigned_meanwhile_is_kept(self):
+        taken_order = self.orders[0]
+        solve_assignment = dispatch.solve_assignment
+
+        def solve_while_manager_assigns(*args, **kwargs):
+            Order.objects.filter(pk=taken_order.pk).update(cooking_restaurant=self.far)
+            return solve_assignment(*args, **kwargs)
+
+        with mock.patch('foodcartapp.dispatch.solve_assignment', solve_while_manager_assigns), \
+                mock.patch('foodcartapp.dispatch.adjust_load') as adjust_load, \
+                self.captureOnCommitCallbacks(execute=True):
+            assignments = dispatch_orders()
+
+        self.assertNotIn(taken_order.id, [order_id for order_id, _, _ in assignments])
+        self.assertEqual(self.get_assigned()[taken_order.id], self.far.id)
+        self.assertEqual(sum(call.args[2] for call in adjust_load.call_args_list), len(assignments))
+
+    def test_dry_run_changes_nothing(self):
+        assignments = dispatch_orders(dry_run=True)
+
+        self.assertEqual(len(assignments), 3)
+        self.assertEqual(self.get_assigned(), {})
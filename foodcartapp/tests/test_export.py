@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from foodcartapp.export import export_csv, export_ndjson, get_export_orders
+from foodcartapp.models import Order, OrderProduct, Product
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class ExportOrdersTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        self.now = timezone.now()
+        self.orders = [
+            self.create_order(registered_at=self.now - timedelta(days=5 - number), lines=number % 3)
+            for number in range(5)
+        ]
+
+    def create_order(self, registered_at, lines, **fields):
+        order = create_order(registered_at=registered_at, **fields)
+        for _ in range(lines):
+            OrderProduct.objects.create(order=order, product=self.product, quantity=2, price=100)
+        return order
+
+    def read_csv(self, chunks):
+        return list(csv.DictReader(io.StringIO(''.join(chunks).lstrip('﻿'))))
+
+    def test_csv_has_a_row_per_line_and_per_order_without_lines(self):
+        rows = self.read_csv(export_csv(get_export_orders()))
+
+        self.assertEqual(len(rows), 1 + 1 + 2 + 1 + 1)
+        self.assertEqual([int(row['id']) for row in rows][:2], [self.orders[0].id, self.orders[1].id])
+        self.assertEqual(rows[1]['product_name'], 'Чизбургер')
+        self.assertEqual(rows[0]['product_name'], '')
+
+    def test_chunks_take_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(export_ndjson(get_export_orders(), chunk_size=2))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunk.count('\n') for chunk in chunks), 5)
+        # The orders cursor plus one lines query per chunk.
+        self.assertLessEqual(len(queries), 1 + len(chunks) + 1)
+
+    def test_ndjson_nests_lines_into_orders(self):
+        orders = [json.loads(line) for line in ''.join(export_ndjson(get_export_orders())).splitlines()]
+
+        self.assertEqual([order['id'] for order in orders], [order.id for order in self.orders])
+        self.assertEqual(len(orders[2]['products']), 2)
+        self.assertEqual(orders[2]['products'][0]['quantity'], 2)
+
+    def test_period_filter(self):
+        orders = get_export_orders(
+            registered_after=self.now - timedelta(days=4),
+            registered_before=self.now - timedelta(days=2),
+        )
+
+        self.assertEqual([row[0] for row in orders], [self.orders[1].id, self.orders[2].id])
+
+    def test_csv_escapes_formulas(self):
+        Order.objects.all().delete()
+        self.create_order(self.now, lines=0, firstname='=HYPERLINK("http://example.com")', comment='@SUM(A1)')
+
+        row = self.read_csv(export_csv(get_export_orders()))[0]
+
+        self.assertEqual(row['firstname'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['comment'], "'@SUM(A1)")
+        self.assertEqual(row['phonenumber'], "'+79001234567")
+        self.assertEqual(row['lastname'], 'Петров')
+
+    def test_command_accepts_dates(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, 'orders.ndjson')
+        day = (self.now - timedelta(days=1)).date()
+
+        call_command(
+            'export_orders', '--format', 'ndjson', '--registered-after', day.isoformat(), '--output', output,
+            stdout=io.StringIO(),
+        )
+
+        with open(output, encoding='utf-8') as file:
+            exported_ids = [json.loads(line)['id'] for line in file]
+        self.assertTrue(exported_ids)
+        self.assertLessEqual(set(exported_ids), {order.id for order in self.orders[-2:]})
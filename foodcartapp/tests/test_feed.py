@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from foodcartapp.feed import (
+    InvalidFeedCursor,
+    decode_feed_cursor,
+    get_changed_orders,
+    get_feed_cursor,
+    get_seen_key,
+    get_seen_orders,
+)
+from foodcartapp.models import Order
+
+from .helpers import FoodcartTestCase, create_order
+
+
+def touch(order, updated_at):
+    Order.objects.filter(pk=order.pk).update(updated_at=updated_at)
+
+
+@override_settings(ORDER_FEED_LOOKBACK=30)
+class OrderFeedTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.order = create_order()
+        touch(self.order, self.now)
+
+    def get_changed_ids(self, cursor, limit=10):
+        orders, cursor = get_changed_orders(Order.objects.all(), cursor, limit)
+        return [order.id for order in orders], cursor
+
+    def test_returns_each_change_once(self):
+        cursor = get_feed_cursor()
+        other_order = create_order()
+        touch(other_order, self.now + timedelta(seconds=1))
+
+        changed_ids, cursor = self.get_changed_ids(cursor)
+        self.assertEqual(changed_ids, [other_order.id])
+        self.assertEqual(self.get_changed_ids(cursor), ([], cursor))
+
+        touch(other_order, self.now + timedelta(seconds=2))
+        self.assertEqual(self.get_changed_ids(cursor)[0], [other_order.id])
+
+    def test_late_commit_within_lookback_is_not_lost(self):
+        cursor = get_feed_cursor()
+        # Saved earlier than the newest change, but committed after the cursor was taken.
+        late_order = create_order()
+        touch(late_order, self.now - timedelta(seconds=10))
+
+        changed_ids, cursor = self.get_changed_ids(cursor)
+        self.assertEqual(changed_ids, [late_order.id])
+        self.assertEqual(self.get_changed_ids(cursor)[0], [])
+
+    def test_changes_older_than_lookback_are_skipped(self):
+        cursor = get_feed_cursor()
+        touch(create_order(), self.now - timedelta(seconds=31))
+
+        self.assertEqual(self.get_changed_ids(cursor)[0], [])
+
+    def test_bulk_change_is_paged_without_repeats(self):
+        cursor = get_feed_cursor()
+        orders = [create_order() for _ in range(5)]
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(updated_at=self.now + timedelta(seconds=1))
+
+        pages = []
+        while True:
+            changed_ids, cursor = self.get_changed_ids(cursor, limit=2)
+            if not changed_ids:
+                break
+            pages.append(changed_ids)
+
+        self.assertEqual(pages, [[orders[0].id, orders[1].id], [orders[2].id, orders[3].id], [orders[4].id]])
+
+    def test_cursor_forgets_orders_behind_lookback(self):
+        cursor = get_feed_cursor()
+        later_order = create_order()
+        touch(later_order, self.now + timedelta(seconds=40))
+
+        _, cursor = self.get_changed_ids(cursor)
+
+        self.assertEqual(
+            get_seen_orders(decode_feed_cursor(cursor)[1]),
+            {later_order.id: self.now + timedelta(seconds=40)},
+        )
+
+    def test_cursor_size_does_not_grow_with_recent_changes(self):
+        small_cursor = get_feed_cursor()
+        orders = Order.objects.bulk_create([
+            Order(firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва', payment_method='CS')
+            for _ in range(1500)
+        ])
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(updated_at=self.now)
+
+        cursor = get_feed_cursor()
+
+        self.assertEqual(len(cursor), len(small_cursor))
+        self.assertEqual(len(get_seen_orders(decode_feed_cursor(cursor)[1])), 1501)
+
+    def test_window_is_sent_again_when_cache_drops_seen_orders(self):
+        cursor = get_feed_cursor()
+        cache.delete(get_seen_key(decode_feed_cursor(cursor)[1]))
+
+        changed_ids, cursor = self.get_changed_ids(cursor)
+
+        self.assertEqual(changed_ids, [self.order.id])
+        self.assertEqual(self.get_changed_ids(cursor)[0], [])
+
+    def test_only_changed_orders_are_loaded(self):
+        cursor = get_feed_cursor()
+        other_order = create_order()
+        touch(other_order, self.now + timedelta(seconds=1))
+
+        with self.assertNumQueries(2):
+            self.get_changed_ids(cursor)
+
+    def test_invalid_cursor(self):
+        for cursor in ['', 'garbage', get_feed_cursor()[:-8]]:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidFeedCursor):
+                decode_feed_cursor(cursor)
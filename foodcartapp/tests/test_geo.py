@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+from django.test import SimpleTestCase
+from geopy import distance
+
+from foodcartapp.geo import HAVERSINE_TOLERANCE, DistanceEngine
+
+
+def make_restaurant(name, latitude, longitude):
+    return SimpleNamespace(name=name, latitude=latitude, longitude=longitude)
+
+
+class DistanceEngineTest(SimpleTestCase):
+    def setUp(self):
+        self.restaurants = [
+            make_restaurant('Дальний', '55.900000', '37.610000'),
+            make_restaurant('Без координат', None, None),
+            make_restaurant('Ближний', '55.760000', '37.610000'),
+            make_restaurant('Средний', '55.750000', '37.700000'),
+        ]
+        self.engine = DistanceEngine(self.restaurants)
+        self.points = [('55.750000', '37.610000'), (59.94, 30.31)]
+
+    def get_names(self, candidates):
+        return [[restaurant.name for restaurant, _ in row] for row in candidates]
+
+    def test_restaurants_are_ranked_by_distance(self):
+        candidates = self.engine.top_candidates(self.points)
+
+        self.assertEqual(self.get_names(candidates), [
+            ['Ближний', 'Средний', 'Дальний'],
+            # Saint Petersburg is to the north-west of all of them.
+            ['Дальний', 'Ближний', 'Средний'],
+        ])
+
+    def test_distances_match_geodesic(self):
+        for point, row in zip(self.points, self.engine.top_candidates(self.points)):
+            for restaurant, km in row:
+                expected = distance.distance(point, (restaurant.latitude, restaurant.longitude)).km
+                self.assertAlmostEqual(km, expected, delta=expected * HAVERSINE_TOLERANCE)
+
+    def test_k_keeps_the_nearest(self):
+        candidates = self.engine.top_candidates(self.points, k=2)
+
+        self.assertEqual(self.get_names(candidates), [['Ближний', 'Средний'], ['Дальний', 'Ближний']])
+
+    def test_mask_drops_restaurants(self):
+        mask = np.array([[True, False, True], [False, False, False]])
+
+        candidates = self.engine.top_candidates(self.points, mask=mask)
+
+        self.assertEqual(self.get_names(candidates), [['Средний', 'Дальний'], []])
+
+    def test_no_restaurants(self):
+        engine = DistanceEngine([make_restaurant('Без координат', None, None)])
+
+        self.assertEqual(engine.top_candidates(self.points), [[], []])
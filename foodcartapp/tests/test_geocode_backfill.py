@@ -0,0 +1,47 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from foodcartapp.models import Order, Restaurant
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class GeocodeBackfillTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = [create_order(address=f'Москва, Тверская, {number}') for number in range(1, 4)]
+        self.restaurants = [
+            Restaurant.objects.create(name=f'Ресторан {number}', address=f'Москва, Арбат, {number}')
+            for number in range(1, 3)
+        ]
+
+    def backfill(self, *args):
+        with mock.patch('foodcartapp.management.commands.geocode_backfill.fetch_coordinates',
+                        return_value=('37.6', '55.7')):
+            call_command('geocode_backfill', *args, '--workers', '1', '--qps', '0', stdout=StringIO())
+
+    def test_fills_missing_coordinates(self):
+        self.backfill()
+
+        self.assertFalse(Order.objects.filter(latitude__isnull=True).exists())
+        self.assertFalse(Restaurant.objects.filter(latitude__isnull=True).exists())
+
+    def test_each_model_resumes_from_its_own_id(self):
+        self.backfill('--after-order-id', str(self.orders[1].pk), '--after-restaurant-id', str(self.restaurants[0].pk))
+
+        self.assertEqual(
+            list(Order.objects.filter(latitude__isnull=False).values_list('pk', flat=True)),
+            [self.orders[2].pk],
+        )
+        self.assertEqual(
+            list(Restaurant.objects.filter(latitude__isnull=False).values_list('pk', flat=True)),
+            [self.restaurants[1].pk],
+        )
+
+    def test_order_id_does_not_skip_restaurants(self):
+        self.backfill('--after-order-id', str(self.orders[-1].pk))
+
+        self.assertEqual(Order.objects.filter(latitude__isnull=False).count(), 0)
+        self.assertEqual(Restaurant.objects.filter(latitude__isnull=False).count(), 2)
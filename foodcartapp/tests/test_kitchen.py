@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.models import OrderProduct, Product, Restaurant
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class KitchenQueueApiTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(name='Ресторан')
+        self.other_restaurant = Restaurant.objects.create(name='Другой')
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+    def create_order(self, restaurant, status='CK'):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = create_order(cooking_restaurant=restaurant, status=status)
+            OrderProduct.objects.create(order=order, product=self.product, quantity=2, price=100)
+        return order
+
+    def get_queue(self, **params):
+        return self.client.get(f'/api/restaurants/{self.restaurant.id}/kitchen/', params)
+
+    def test_queue_holds_orders_being_cooked_by_the_restaurant(self):
+        order = self.create_order(self.restaurant)
+        self.create_order(self.restaurant, status='DL')
+        self.create_order(self.other_restaurant)
+
+        response = self.get_queue()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(order['id'], order['products']) for order in response.json()['orders']],
+            [(order.id, [{'name': 'Чизбургер', 'quantity': 2}])],
+        )
+
+    def test_polling_an_unchanged_queue_skips_orders(self):
+        self.create_order(self.restaurant)
+        version = self.get_queue().json()['version']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_queue(since=version)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'foodcartapp_order' in query['sql']])
+
+    def test_committed_changes_move_the_version(self):
+        order = self.create_order(self.restaurant)
+        version = self.get_queue().json()['version']
+
+        self.create_order(self.other_restaurant)
+        self.assertEqual(self.get_queue(since=version).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'DL'
+            order.save()
+
+        response = self.get_queue(since=version)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()['version'], version)
+        self.assertEqual(response.json()['orders'], [])
+
+    def test_queue_is_for_managers_only(self):
+        self.client.logout()
+
+        self.assertEqual(self.get_queue().status_code, 403)
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.core.cache import cache
+
+from foodcartapp import load
+from foodcartapp.load import READY_KEY, adjust_load, get_load_key, get_restaurant_loads, reconcile_loads
+from foodcartapp.models import Restaurant
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class RestaurantLoadTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(name='Ресторан')
+
+    def create_order(self, status='NP'):
+        return create_order(cooking_restaurant=self.restaurant, status=status)
+
+    def get_load(self):
+        return get_restaurant_loads([self.restaurant.id])[self.restaurant.id]
+
+    def test_counters_follow_order_status(self):
+        reconcile_loads()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order()
+            self.create_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'CK'
+            order.save()
+
+        self.assertEqual(self.get_load(), {'NP': 1, 'CK': 1, 'DL': 0})
+
+    def test_evicted_counter_is_recounted(self):
+        reconcile_loads()
+        self.create_order()
+        self.create_order()
+        cache.delete(get_load_key(self.restaurant.id, 'NP'))
+
+        # The third order's adjustment finds no counter; the other two must not be forgotten.
+        self.create_order()
+        adjust_load(self.restaurant.id, 'NP', 1)
+
+        self.assertEqual(cache.get(get_load_key(self.restaurant.id, 'NP')), 3)
+        self.assertIsNone(cache.get(READY_KEY))
+
+    def test_reconciliation_recounts_after_concurrent_adjustment(self):
+        reconcile_loads()
+        cache.delete(READY_KEY)
+        count_loads = load.count_loads
+
+        def count_while_order_commits(restaurant_ids=None):
+            loads = count_loads(restaurant_ids)
+            if count.call_count == 1:
+                # Committed after the count, adjusted before the counters are written.
+                self.create_order()
+                adjust_load(self.restaurant.id, 'NP', 1)
+            return loads
+
+        with mock.patch('foodcartapp.load.count_loads', side_effect=count_while_order_commits) as count:
+            reconcile_loads()
+
+        self.assertEqual(count.call_count, 2)
+        self.assertEqual(cache.get(get_load_key(self.restaurant.id, 'NP')), 1)
+        self.assertTrue(cache.get(READY_KEY))
+
+    def test_check_reports_mismatches(self):
+        reconcile_loads()
+        self.create_order()
+
+        self.assertEqual(reconcile_loads(fix=False), [(self.restaurant.id, 'NP', 0, 1)])
+        self.assertEqual(cache.get(get_load_key(self.restaurant.id, 'NP')), 0)
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+
+from foodcartapp.availability import get_availability_index
+from foodcartapp.menu import get_menu_item_batches, set_menu_availability
+from foodcartapp.models import OrderCandidate, OrderProduct, Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class MenuAvailabilityTestCase(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurants = [
+                Restaurant.objects.create(name=f'Ресторан {number}', latitude=55.75 + number / 100, longitude=37.61)
+                for number in range(3)
+            ]
+            self.products = [
+                Product.objects.create(name=f'Бургер {number}', price=100, image='burger.jpg')
+                for number in range(2)
+            ]
+            for restaurant in self.restaurants:
+                for product in self.products:
+                    RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+    def get_selling(self):
+        return list(Product.objects.order_by('id').values_list('restaurants_selling', flat=True))
+
+
+class GetMenuItemBatchesTest(MenuAvailabilityTestCase):
+    def test_batches_cover_every_pair_once(self):
+        pairs = [(restaurant.id, product.id) for restaurant in self.restaurants for product in self.products]
+
+        with mock.patch('foodcartapp.menu.MENU_BATCH_SIZE', 2):
+            batches = list(get_menu_item_batches(pairs))
+
+        batch_pairs = [list(menu_items.values_list('restaurant_id', 'product_id')) for menu_items in batches]
+        self.assertTrue(all(len(found_pairs) <= 2 for found_pairs in batch_pairs))
+        self.assertEqual(sorted(pair for found_pairs in batch_pairs for pair in found_pairs), sorted(pairs))
+
+
+class SetMenuAvailabilityTest(MenuAvailabilityTestCase):
+    def test_only_changed_items_are_counted(self):
+        menu_items = RestaurantMenuItem.objects.filter(product=self.products[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_menu_availability([menu_items.filter(restaurant=self.restaurants[0])], False), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(set_menu_availability([menu_items], False), 2)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(set_menu_availability([menu_items], False), 0)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.get_selling(), [0, 3])
+
+    def test_caches_and_candidates_follow_on_commit(self):
+        order = create_order(latitude=55.75, longitude=37.61)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderProduct.objects.create(order=order, product=self.products[0], price=100)
+        self.client.get('/api/products/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_menu_availability(
+                get_menu_item_batches([(self.restaurants[0].id, self.products[0].id)]),
+                False,
+            )
+
+        restaurant_ids = [restaurant.id for restaurant in self.restaurants]
+        self.assertEqual(
+            get_availability_index().restaurants_for({self.products[0].id}, restaurant_ids),
+            restaurant_ids[1:],
+        )
+        self.assertEqual(
+            list(OrderCandidate.objects.filter(order=order).order_by('rank').values_list('restaurant_id', flat=True)),
+            restaurant_ids[1:],
+        )
+        self.assertEqual(len(self.client.get('/api/products/').json()), 2)
+
+
+class MenuAvailabilityApiTest(MenuAvailabilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+    def post(self, data):
+        return self.client.post('/api/menu/availability/', data, content_type='application/json')
+
+    def test_restaurants_times_products(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post({
+                'available': False,
+                'restaurants': [restaurant.id for restaurant in self.restaurants],
+                'products': [self.products[1].id],
+            })
+
+        self.assertEqual(response.json(), {'updated': 3})
+        self.assertEqual(self.get_selling(), [3, 0])
+        self.assertEqual(len(self.client.get('/api/products/').json()), 1)
+
+    def test_items(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post({
+                'available': False,
+                'items': [[self.restaurants[0].id, self.products[0].id], [self.restaurants[1].id, self.products[1].id]],
+            })
+
+        self.assertEqual(response.json(), {'updated': 2})
+        self.assertEqual(self.get_selling(), [2, 2])
+
+    def test_items_and_restaurants_exclude_each_other(self):
+        response = self.post({
+            'available': False,
+            'items': [[self.restaurants[0].id, self.products[0].id]],
+            'restaurants': [self.restaurants[0].id],
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get_selling(), [3, 3])
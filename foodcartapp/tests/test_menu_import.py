@@ -0,0 +1,173 @@
+import io
+import os
+import tempfile
+from decimal import Decimal
+from django.core.management import call_command
+from django.contrib.auth.models import User
+
+from foodcartapp.menu_import import MenuImportError, import_menu, read_rows
+from foodcartapp.models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase
+
+
+def import_csv(text, chunk_size=2):
+    return import_menu(read_rows(io.StringIO(text), 'csv'), chunk_size=chunk_size)
+
+
+class ImportMenuTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(name='Ресторан')
+        self.burger = Product.objects.create(code='B-1', name='Чизбургер', price=100, image='burger.jpg')
+
+    def test_upserts_products_by_code(self):
+        stats = import_csv(
+            'code,product,price,category,image\n'
+            'B-1,Чизбургер двойной,150,Бургеры,burger.jpg\n'
+            'F-1,Картошка,50,Гарниры,fries.jpg\n'
+            'D-1,Кола,70,Напитки,cola.jpg\n',
+        )
+
+        self.assertEqual((stats['rows'], stats['imported'], stats['errors']), (3, 3, 0))
+        self.burger.refresh_from_db()
+        self.assertEqual((self.burger.name, self.burger.price), ('Чизбургер двойной', Decimal('150')))
+        self.assertEqual(self.burger.category.name, 'Бургеры')
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_products_may_share_a_name(self):
+        import_csv('code,product,price,image\nB-2,Чизбургер,120,burger2.jpg\n')
+
+        self.assertEqual(Product.objects.filter(name='Чизбургер').count(), 2)
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.price, Decimal('100'))
+
+    def test_existing_category_is_reused(self):
+        category = ProductCategory.objects.create(name='Бургеры')
+
+        import_csv('code,product,price,category,image\nB-1,Чизбургер,100,Бургеры,burger.jpg\n')
+
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.category, category)
+        self.assertEqual(ProductCategory.objects.count(), 1)
+
+    def test_adds_products_to_menus(self):
+        stats = import_csv(
+            'code,restaurant,availability\n'
+            'B-1,Ресторан,да\n',
+        )
+
+        self.assertEqual(stats['imported'], 1)
+        menu_item = RestaurantMenuItem.objects.get(restaurant=self.restaurant, product=self.burger)
+        self.assertTrue(menu_item.availability)
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.restaurants_selling, 1)
+        # Candidates of open orders are recomputed in the background, not within the import.
+        self.enqueue_all_candidates_refresh.assert_called_once_with()
+
+        import_csv('code,restaurant,availability\nB-1,Ресторан,нет\n')
+
+        menu_item.refresh_from_db()
+        self.assertFalse(menu_item.availability)
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        Restaurant.objects.create(name='Двойник')
+        Restaurant.objects.create(name='Двойник')
+        stats = import_csv(
+            'code,restaurant\n'
+            'B-1,Ресторан\n'
+            'X-1,Ресторан\n'
+            'B-1,Нет такого\n'
+            'B-1,Двойник\n'
+            ',Ресторан\n',
+        )
+
+        self.assertEqual((stats['rows'], stats['imported'], stats['errors']), (5, 1, 4))
+        self.assertEqual([line_number for line_number, _ in stats['error_samples']], [3, 4, 5, 6])
+        self.assertIn('X-1', stats['error_samples'][0][1])
+        self.assertIn('несколько ресторанов', stats['error_samples'][2][1])
+
+    def test_products_are_found_by_name_without_code_column(self):
+        Product.objects.create(name='Картошка', price=50, image='fries.jpg')
+        Product.objects.create(name='Картошка', price=60, image='fries.jpg')
+
+        stats = import_csv('product,restaurant\nЧизбургер,Ресторан\nКартошка,Ресторан\n')
+
+        self.assertEqual(stats['imported'], 1)
+        self.assertIn('несколько товаров', stats['error_samples'][0][1])
+
+    def test_rejects_unexpected_columns(self):
+        for text in ['price\n1\n', 'code,color\nB-1,red\n', 'product,price\nЧизбургер,1\n', 'code,category\nB-1,Бургеры\n']:
+            with self.subTest(text=text), self.assertRaises(MenuImportError):
+                import_csv(text)
+
+    def test_reads_ndjson(self):
+        lines = io.StringIO(
+            '{"code": "B-1", "restaurant": "Ресторан"}\n'
+            '\n'
+            'not json\n'
+        )
+
+        stats = import_menu(read_rows(lines, 'ndjson'))
+
+        self.assertEqual((stats['imported'], stats['errors']), (1, 1))
+        self.assertEqual(stats['error_samples'][0][0], 3)
+
+    def test_ndjson_values_that_are_not_strings_are_bad_rows(self):
+        lines = io.StringIO(
+            '{"code": "B-1", "product": "Чизбургер", "price": 1, "image": {"x": 1}, "restaurant": "Ресторан"}\n'
+            '{"code": "B-1", "product": "Чизбургер", "price": 1, "image": "", "restaurant": ["Ресторан"]}\n'
+        )
+
+        stats = import_menu(read_rows(lines, 'ndjson'))
+
+        self.assertEqual(stats['error_samples'], [
+            (1, 'image: путь к картинке должен быть строкой'),
+            (2, 'restaurant: название ресторана должно быть строкой'),
+        ])
+        self.assertFalse(RestaurantMenuItem.objects.exists())
+
+    def test_command_prints_progress(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as file:
+            file.write('code,restaurant\nB-1,Ресторан\n')
+        self.addCleanup(os.unlink, file.name)
+        stdout = io.StringIO()
+
+        call_command('import_menu', file.name, stdout=stdout)
+
+        self.assertIn('строк/с', stdout.getvalue())
+        self.assertTrue(RestaurantMenuItem.objects.filter(product=self.burger).exists())
+
+
+
+class ImportProductImageTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        restaurant = Restaurant.objects.create(name='Ресторан')
+        self.burger = Product.objects.create(code='B-1', name='Чизбургер', price=100, image='burger.jpg')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=self.burger)
+
+    def test_new_product_needs_an_image(self):
+        stats = import_csv('code,product,price\nF-1,Картошка,50\nB-1,Чизбургер,120\n')
+
+        self.assertEqual(stats['error_samples'], [(2, 'image: у нового товара должна быть картинка')])
+        self.assertFalse(Product.objects.filter(code='F-1').exists())
+
+    def test_empty_image_keeps_the_existing_one(self):
+        stats = import_csv('code,product,price,image\nB-1,Чизбургер,120,\nF-1,Картошка,50,fries.jpg\n')
+
+        self.assertEqual(stats['errors'], 0)
+        self.burger.refresh_from_db()
+        self.assertEqual((self.burger.price, self.burger.image.name), (Decimal('120'), 'burger.jpg'))
+        self.assertEqual(Product.objects.get(code='F-1').image.name, 'fries.jpg')
+
+    def test_catalog_and_menu_page_render_after_import(self):
+        import_csv('code,product,price,image\nB-1,Чизбургер,120,\nF-1,Картошка,50,\n')
+        import_csv('code,product,price\nD-1,Кола,70\n')
+        import_csv('code,restaurant\nF-1,Ресторан\nD-1,Ресторан\n')
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(product['name'] for product in response.json()), ['Чизбургер'])
+        self.assertEqual(self.client.get('/manager/products/').status_code, 200)
@@ -0,0 +1,48 @@
+from foodcartapp.menu_table import get_menu_table
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase
+
+
+class MenuTableTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second = Restaurant.objects.create(name='Б-ресторан')
+            self.first = Restaurant.objects.create(name='А-ресторан')
+            self.burger = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+            self.fries = Product.objects.create(name='Картошка', price=50, image='fries.jpg')
+            RestaurantMenuItem.objects.create(restaurant=self.first, product=self.burger)
+            RestaurantMenuItem.objects.create(restaurant=self.second, product=self.fries)
+
+    def get_table(self):
+        restaurants, rows = get_menu_table()
+        return [name for _, name in restaurants], [(product['name'], available) for product, available in rows]
+
+    def test_rows_follow_restaurant_names(self):
+        self.assertEqual(self.get_table(), (
+            ['А-ресторан', 'Б-ресторан'],
+            [('Чизбургер', [True, False]), ('Картошка', [False, True])],
+        ))
+
+    def test_table_is_served_from_cache(self):
+        self.get_table()
+
+        with self.assertNumQueries(0):
+            self.get_table()
+
+    def test_committed_changes_rebuild_table(self):
+        self.get_table()
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item = RestaurantMenuItem.objects.get(product=self.burger)
+            menu_item.restaurant = self.second
+            menu_item.save()
+            self.fries.name = 'Картофель фри'
+            self.fries.save()
+            self.second.name = 'В-ресторан'
+            self.second.save()
+
+        self.assertEqual(self.get_table(), (
+            ['А-ресторан', 'В-ресторан'],
+            [('Чизбургер', [False, True]), ('Картофель фри', [False, True])],
+        ))
@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+from foodcartapp.models import Order, OrderProduct, Product
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class OrderTotalCostTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        self.order = create_order()
+
+    def get_total_cost(self, order):
+        return Order.objects.get(pk=order.pk).total_cost
+
+    def test_follows_order_lines(self):
+        line = OrderProduct.objects.create(order=self.order, product=self.product, quantity=2, price=100)
+        self.assertEqual(self.get_total_cost(self.order), Decimal('200'))
+
+        line.quantity = 3
+        line.save()
+        self.assertEqual(self.get_total_cost(self.order), Decimal('300'))
+
+        line.delete()
+        self.assertEqual(self.get_total_cost(self.order), Decimal('0'))
+
+    def test_line_moved_to_another_order_updates_both(self):
+        line = OrderProduct.objects.create(order=self.order, product=self.product, quantity=2, price=100)
+        other_order = create_order()
+
+        line.order = other_order
+        line.save()
+
+        self.assertEqual(self.get_total_cost(self.order), Decimal('0'))
+        self.assertEqual(self.get_total_cost(other_order), Decimal('200'))
@@ -0,0 +1,83 @@
+import gzip
+import json
+import unittest
+
+from django.test import RequestFactory, SimpleTestCase
+
+from foodcartapp import payloads
+from foodcartapp.payloads import choose_encoding, make_json_payload, payload_response
+
+
+class MakeJsonPayloadTest(SimpleTestCase):
+    def test_variants_hold_the_same_compact_json(self):
+        payload = make_json_payload([{'name': 'Чизбургер', 'price': 100}])
+
+        body = payload['variants']['identity']
+        self.assertEqual(body, '[{"name":"Чизбургер","price":100}]'.encode())
+        self.assertEqual(gzip.decompress(payload['variants']['gzip']), body)
+
+    def test_etag_depends_on_content_only(self):
+        self.assertEqual(make_json_payload({'a': 1})['etag'], make_json_payload({'a': 1})['etag'])
+        self.assertNotEqual(make_json_payload({'a': 1})['etag'], make_json_payload({'a': 2})['etag'])
+        # gzip output carries no timestamp, so it is the same bytes every time.
+        self.assertEqual(make_json_payload({'a': 1})['variants'], make_json_payload({'a': 1})['variants'])
+
+    @unittest.skipUnless(payloads.brotli, 'brotli не установлен')
+    def test_brotli_variant(self):
+        payload = make_json_payload({'a': 1})
+
+        self.assertEqual(payloads.brotli.decompress(payload['variants']['br']), payload['variants']['identity'])
+
+
+class ChooseEncodingTest(SimpleTestCase):
+    available = {'identity': b'', 'gzip': b'', 'br': b''}
+
+    def test_best_accepted_encoding_wins(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br', self.available), 'br')
+        self.assertEqual(choose_encoding('gzip, deflate', self.available), 'gzip')
+        self.assertEqual(choose_encoding('*', self.available), 'br')
+        self.assertEqual(choose_encoding('', self.available), 'identity')
+
+    def test_refused_encodings_are_skipped(self):
+        self.assertEqual(choose_encoding('br;q=0, gzip;q=0.5', self.available), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0', self.available), 'identity')
+        self.assertEqual(choose_encoding('gzip;q=oops', self.available), 'identity')
+
+    def test_only_available_variants_are_chosen(self):
+        self.assertEqual(choose_encoding('br, gzip', {'identity': b'', 'gzip': b''}), 'gzip')
+
+
+class PayloadResponseTest(SimpleTestCase):
+    def setUp(self):
+        self.payload = make_json_payload({'a': 1})
+        self.factory = RequestFactory()
+
+    def test_compressed_variant_has_its_own_etag(self):
+        plain = payload_response(self.factory.get('/'), self.payload)
+        compressed = payload_response(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), self.payload)
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(json.loads(plain.content), {'a': 1})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed.content, self.payload['variants']['gzip'])
+        self.assertNotEqual(plain['ETag'], compressed['ETag'])
+        for response in [plain, compressed]:
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_matching_etag_is_not_modified(self):
+        etag = payload_response(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), self.payload)['ETag']
+
+        response = payload_response(
+            self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag),
+            self.payload,
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_banners_are_served_as_payload(self):
+        response = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        banners = json.loads(gzip.decompress(response.content))
+        self.assertEqual([banner['title'] for banner in banners], ['Burger', 'Spices', 'New York'])
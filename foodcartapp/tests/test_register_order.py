@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.models import Order, Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase
+
+
+class RegisterOrderTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        restaurant = Restaurant.objects.create(name='Ресторан')
+        self.products = [
+            Product.objects.create(name=f'Бургер {number}', price=100 + number, image='burger.jpg')
+            for number in range(5)
+        ]
+        for product in self.products:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        self.off_sale = Product.objects.create(name='Картошка', price=50, image='fries.jpg')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=self.off_sale, availability=False)
+
+    def post_order(self, products):
+        return self.client.post('/api/order/', {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79001234567',
+            'address': 'Москва, Тверская, 1',
+            'products': products,
+        }, content_type='application/json')
+
+    def test_order_is_saved_with_its_lines(self):
+        response = self.post_order([
+            {'product': self.products[0].id, 'quantity': 2},
+            {'product': self.products[1].id, 'quantity': 1},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(order.total_cost, 2 * 100 + 101)
+        self.assertEqual(
+            sorted(order.products.values_list('product_id', 'quantity', 'price')),
+            [(self.products[0].id, 2, 100), (self.products[1].id, 1, 101)],
+        )
+
+    def test_every_bad_line_is_reported(self):
+        response = self.post_order([
+            {'product': self.products[0].id, 'quantity': 1},
+            {'product': 999999, 'quantity': 1},
+            {'product': self.off_sale.id, 'quantity': 1},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'products': [
+            {},
+            {'product': ['Товара с id 999999 не существует']},
+            {'product': ['Товар «Картошка» сейчас не продаётся']},
+        ]})
+        self.assertFalse(Order.objects.exists())
+
+    def test_cart_is_validated_in_one_query(self):
+        def count_queries(products):
+            with CaptureQueriesContext(connection) as queries:
+                self.post_order([{'product': product.id, 'quantity': 1} for product in products] + [
+                    {'product': 999999, 'quantity': 1},
+                ])
+            return len(queries)
+
+        self.assertEqual(count_queries(self.products[:1]), count_queries(self.products))
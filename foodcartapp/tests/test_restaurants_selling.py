@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+
+from .helpers import FoodcartTestCase
+
+
+class RestaurantsSellingTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = Restaurant.objects.create(name='Первый')
+        self.second = Restaurant.objects.create(name='Второй')
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        self.other_product = Product.objects.create(name='Картошка', price=50, image='fries.jpg')
+
+    def get_counter(self, product=None):
+        return Product.objects.values_list('restaurants_selling', flat=True).get(pk=(product or self.product).pk)
+
+    def test_counter_follows_menu_items(self):
+        menu_item = RestaurantMenuItem.objects.create(restaurant=self.first, product=self.product)
+        RestaurantMenuItem.objects.create(restaurant=self.second, product=self.product)
+        self.assertEqual(self.get_counter(), 2)
+        self.assertEqual(list(Product.objects.available()), [self.product])
+
+        menu_item.availability = False
+        menu_item.save()
+        self.assertEqual(self.get_counter(), 1)
+
+        menu_item.availability = True
+        menu_item.product = self.other_product
+        menu_item.save()
+        self.assertEqual((self.get_counter(), self.get_counter(self.other_product)), (1, 1))
+
+        RestaurantMenuItem.objects.filter(product=self.product).delete()
+        self.assertEqual(self.get_counter(), 0)
+        self.assertEqual(list(Product.objects.available()), [self.other_product])
+
+    def test_saving_a_loaded_product_keeps_the_counter(self):
+        product = Product.objects.get(pk=self.product.pk)
+        RestaurantMenuItem.objects.create(restaurant=self.first, product=self.product)
+
+        product.name = 'Двойной чизбургер'
+        product.save()
+
+        self.assertEqual(self.get_counter(), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Двойной чизбургер')
+
+    def test_command_finds_and_fixes_wrong_counters(self):
+        RestaurantMenuItem.objects.create(restaurant=self.first, product=self.product)
+        Product.objects.filter(pk=self.product.pk).update(restaurants_selling=5)
+
+        with self.assertRaises(CommandError):
+            call_command('recalculate_product_availability', '--check', stdout=StringIO())
+        call_command('recalculate_product_availability', stdout=StringIO())
+
+        self.assertEqual(self.get_counter(), 1)
+        call_command('recalculate_product_availability', '--check', stdout=StringIO())
@@ -0,0 +1,122 @@
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from foodcartapp.geo import haversine_matrix, to_radians
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+from foodcartapp.spatial import RestaurantGrid, nearest_restaurants
+
+from .helpers import FoodcartTestCase
+
+
+class RestaurantGridTest(SimpleTestCase):
+    def setUp(self):
+        generator = random.Random(1)
+        self.restaurants = [
+            (restaurant_id, 55.5 + generator.random(), 37.2 + generator.random())
+            for restaurant_id in range(1, 201)
+        ]
+        self.grid = RestaurantGrid(self.restaurants, cell_size=0.05)
+
+    def get_nearest_by_brute_force(self, latitude, longitude, k, restaurants=None):
+        restaurants = self.restaurants if restaurants is None else restaurants
+        distances = haversine_matrix(
+            to_radians([(latitude, longitude)]),
+            to_radians([(lat, lon) for _, lat, lon in restaurants]),
+        )[0]
+        ranked = sorted(zip(distances.tolist(), [restaurant_id for restaurant_id, _, _ in restaurants]))
+        return [restaurant_id for _, restaurant_id in ranked[:k]]
+
+    def test_nearest_matches_brute_force(self):
+        generator = random.Random(2)
+        # Points inside the grid and far outside of it.
+        points = [(55.5 + generator.random(), 37.2 + generator.random()) for _ in range(20)]
+        points += [(59.94, 30.31), (55.0, 38.5)]
+        for latitude, longitude in points:
+            with self.subTest(latitude=latitude, longitude=longitude):
+                nearest = self.grid.nearest(latitude, longitude, 5)
+
+                self.assertEqual(
+                    [restaurant_id for restaurant_id, _ in nearest],
+                    self.get_nearest_by_brute_force(latitude, longitude, 5),
+                )
+                distances = [km for _, km in nearest]
+                self.assertEqual(distances, sorted(distances))
+
+    def test_nearest_skips_ineligible_restaurants(self):
+        def is_eligible(restaurant_ids):
+            return [restaurant_id % 2 == 0 for restaurant_id in restaurant_ids]
+
+        nearest = self.grid.nearest(56.0, 37.7, 5, is_eligible)
+
+        even_restaurants = [restaurant for restaurant in self.restaurants if restaurant[0] % 2 == 0]
+        self.assertEqual(
+            [restaurant_id for restaurant_id, _ in nearest],
+            self.get_nearest_by_brute_force(56.0, 37.7, 5, even_restaurants),
+        )
+
+    def test_few_eligible_restaurants_are_ranked_without_walking_every_cell(self):
+        generator = random.Random(3)
+        # Moscow and Novosibirsk: the bounding box is mostly empty cells.
+        restaurants = [
+            (restaurant_id, latitude + generator.uniform(-0.3, 0.3), longitude + generator.uniform(-0.5, 0.5))
+            for restaurant_id, (latitude, longitude) in enumerate([(55.75, 37.61), (55.03, 82.92)] * 100, start=1)
+        ]
+        grid = RestaurantGrid(restaurants, cell_size=0.05)
+
+        def is_eligible(restaurant_ids):
+            return [restaurant_id in {4, 7} for restaurant_id in restaurant_ids]
+
+        with mock.patch.object(grid, 'iter_ring', wraps=grid.iter_ring) as iter_ring:
+            nearest = grid.nearest(55.75, 37.61, 5, is_eligible)
+            self.assertEqual(grid.nearest(55.75, 37.61, 5, lambda restaurant_ids: [False] * len(restaurant_ids)), [])
+
+        self.assertEqual(
+            [restaurant_id for restaurant_id, _ in nearest],
+            self.get_nearest_by_brute_force(55.75, 37.61, 5, [restaurants[3], restaurants[6]]),
+        )
+        self.assertLess(iter_ring.call_count, 30)
+
+    def test_move_and_remove(self):
+        grid = RestaurantGrid([(1, 55.75, 37.61), (2, 55.80, 37.61)], cell_size=0.05)
+
+        grid.move(2, 55.751, 37.611)
+        self.assertEqual([restaurant_id for restaurant_id, _ in grid.nearest(55.751, 37.611, 2)], [2, 1])
+
+        grid.remove(2)
+        grid.move(1, None, None)
+        self.assertEqual(grid.nearest(55.75, 37.61, 2), [])
+        self.assertEqual(grid.cells, {})
+
+
+class NearestRestaurantsTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+
+    def test_committed_restaurants_are_found_with_their_menus(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            near = Restaurant.objects.create(name='Ближний', latitude=55.75, longitude=37.61)
+            far = Restaurant.objects.create(name='Дальний', latitude=55.85, longitude=37.61)
+            RestaurantMenuItem.objects.create(restaurant=far, product=self.product)
+
+        self.assertEqual([restaurant_id for restaurant_id, _ in nearest_restaurants(55.75, 37.61, 2)], [
+            near.id,
+            far.id,
+        ])
+        nearest = nearest_restaurants(55.75, 37.61, 2, product_ids=[self.product.id])
+        self.assertEqual([restaurant_id for restaurant_id, _ in nearest], [far.id])
+
+    def test_moved_restaurant_is_found_at_its_new_place(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Restaurant.objects.create(name='Первый', latitude=55.75, longitude=37.61)
+            second = Restaurant.objects.create(name='Второй', latitude=55.85, longitude=37.61)
+        nearest_restaurants(55.85, 37.61, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.latitude = 55.851
+            first.save()
+            second.delete()
+
+        self.assertEqual([restaurant_id for restaurant_id, _ in nearest_restaurants(55.85, 37.61, 2)], [first.id])
@@ -0,0 +1,112 @@
+import random
+from itertools import combinations
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+
+from foodcartapp.models import OrderProduct, Product, Restaurant, RestaurantMenuItem
+from foodcartapp.split import plan_cover, plan_split_order
+
+from .helpers import FoodcartTestCase, create_order
+
+
+def find_best_cover(masks, distances, full_mask):
+    for size in range(1, len(masks) + 1):
+        covers = [
+            (sum(distances[index] for index in chosen), chosen)
+            for chosen in combinations(range(len(masks)), size)
+            if sum_masks(masks[index] for index in chosen) & full_mask == full_mask
+        ]
+        if covers:
+            return min(covers)
+    return None
+
+
+def sum_masks(masks):
+    union = 0
+    for mask in masks:
+        union |= mask
+    return union
+
+
+class PlanCoverTest(SimpleTestCase):
+    def test_fewest_then_nearest_restaurants(self):
+        # Products 0..2: one far restaurant sells them all, near ones sell parts.
+        masks = [0b011, 0b100, 0b111, 0b110]
+        distances = [1.0, 2.0, 10.0, 3.0]
+
+        self.assertEqual(plan_cover(masks, distances, 0b111), [2])
+        self.assertEqual(sorted(plan_cover(masks, distances, 0b011)), [0])
+        self.assertIsNone(plan_cover([0b001, 0b010], [1.0, 2.0], 0b111))
+
+    def test_matches_exhaustive_search(self):
+        generator = random.Random(1)
+        for _ in range(200):
+            products = generator.randint(1, 6)
+            full_mask = (1 << products) - 1
+            masks = [generator.randint(0, full_mask) for _ in range(generator.randint(1, 7))]
+            distances = [generator.uniform(0, 20) for _ in masks]
+            with self.subTest(masks=masks, distances=distances):
+                expected = find_best_cover(masks, distances, full_mask)
+
+                chosen = plan_cover(masks, distances, full_mask)
+
+                if expected is None:
+                    self.assertIsNone(chosen)
+                    continue
+                self.assertEqual(sum_masks(masks[index] for index in chosen), full_mask)
+                self.assertEqual(len(chosen), len(expected[1]))
+                self.assertAlmostEqual(sum(distances[index] for index in chosen), expected[0])
+
+
+class PlanSplitOrderTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.burger, self.fries, self.cola = [
+            Product.objects.create(name=name, price=100, image='burger.jpg')
+            for name in ['Чизбургер', 'Картошка', 'Кола']
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.near = Restaurant.objects.create(name='Ближний', latitude=55.75, longitude=37.61)
+            self.far = Restaurant.objects.create(name='Дальний', latitude=55.85, longitude=37.61)
+            for restaurant, products in [
+                (self.near, [self.burger]),
+                (self.far, [self.burger, self.fries]),
+            ]:
+                for product in products:
+                    RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+    def test_products_go_to_the_nearest_chosen_restaurant(self):
+        plan = plan_split_order([self.burger.id, self.fries.id], 55.75, 37.61)
+
+        self.assertEqual([(restaurant_id, products) for restaurant_id, _, products in plan], [
+            (self.far.id, [self.burger.id, self.fries.id]),
+        ])
+
+    def test_order_is_split_when_nobody_sells_everything(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.create(restaurant=self.near, product=self.cola)
+
+        plan = plan_split_order([self.burger.id, self.fries.id, self.cola.id], 55.75, 37.61)
+
+        self.assertEqual([(restaurant_id, products) for restaurant_id, _, products in plan], [
+            (self.near.id, [self.burger.id, self.cola.id]),
+            (self.far.id, [self.fries.id]),
+        ])
+
+    def test_no_plan_for_unsold_products_or_unknown_address(self):
+        self.assertIsNone(plan_split_order([self.burger.id, self.cola.id], 55.75, 37.61))
+        self.assertIsNone(plan_split_order([self.burger.id], None, None))
+
+    def test_api_returns_the_plan(self):
+        order = create_order(latitude=55.75, longitude=37.61)
+        OrderProduct.objects.create(order=order, product=self.fries, price=100)
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+        response = self.client.get(f'/api/orders/{order.id}/split-plan/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'order': order.id, 'plan': [
+            {'restaurant': self.far.id, 'distance_km': mock.ANY, 'products': [self.fries.id]},
+        ]})
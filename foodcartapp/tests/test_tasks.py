@@ -0,0 +1,62 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.utils import timezone
+
+from places.geocoder import GeocoderUnavailable
+
+from foodcartapp.models import Order
+from foodcartapp.tasks import enqueue_order_geocoding, geocode_order, geocoding_slots
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class GeocodeOrderTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = create_order()
+        Order.objects.filter(pk=self.order.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        # geocode_order releases the slot enqueue_order_geocoding took.
+        geocoding_slots.acquire()
+
+    def test_saves_coordinates_and_marks_order_changed(self):
+        updated_at = Order.objects.get(pk=self.order.pk).updated_at
+        with mock.patch('foodcartapp.tasks.get_coordinates', return_value=(Decimal('37.6'), Decimal('55.7'))):
+            geocode_order(self.order.pk)
+
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.longitude, order.latitude), (Decimal('37.6'), Decimal('55.7')))
+        self.assertGreater(order.updated_at, updated_at)
+
+    def test_unavailable_geocoder_is_a_warning(self):
+        with mock.patch('foodcartapp.tasks.get_coordinates', side_effect=GeocoderUnavailable), \
+                self.assertLogs('foodcartapp.tasks', 'WARNING') as logs:
+            geocode_order(self.order.pk)
+
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING'])
+        self.assertIsNone(Order.objects.get(pk=self.order.pk).latitude)
+
+    def test_unexpected_error_is_logged(self):
+        with mock.patch('foodcartapp.tasks.get_coordinates', side_effect=RuntimeError('boom')), \
+                self.assertLogs('foodcartapp.tasks', 'ERROR') as logs:
+            geocode_order(self.order.pk)
+
+        self.assertIsNotNone(logs.records[0].exc_info)
+
+
+class EnqueueOrderGeocodingTest(FoodcartTestCase):
+    def test_queued_order_is_not_queued_twice(self):
+        with mock.patch('foodcartapp.tasks.geocoding_executor') as executor:
+            enqueue_order_geocoding(1)
+            enqueue_order_geocoding(1)
+
+        executor.submit.assert_called_once_with(geocode_order, 1)
+        with mock.patch('foodcartapp.tasks.get_coordinates'):
+            geocode_order(1)
+        with mock.patch('foodcartapp.tasks.geocoding_executor') as executor:
+            enqueue_order_geocoding(1)
+        with mock.patch('foodcartapp.tasks.get_coordinates'):
+            geocode_order(1)
+
+        executor.submit.assert_called_once_with(geocode_order, 1)
@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from foodcartapp.models import OrderSlaBucket, Restaurant
+from foodcartapp.transitions import (
+    SLA_OVERFLOW,
+    InvalidTransition,
+    get_percentile,
+    get_sla_bucket,
+    get_sla_percentiles,
+    transition_order,
+)
+
+from .helpers import FoodcartTestCase, create_order
+
+
+class SlaBucketTest(SimpleTestCase):
+    def test_durations_round_up_to_bucket_bounds(self):
+        self.assertEqual(get_sla_bucket(timedelta(minutes=3)), 5)
+        self.assertEqual(get_sla_bucket(timedelta(minutes=5)), 5)
+        self.assertEqual(get_sla_bucket(timedelta(minutes=5, seconds=1)), 10)
+        self.assertEqual(get_sla_bucket(timedelta(days=2)), SLA_OVERFLOW)
+
+    def test_percentile_is_a_bucket_bound(self):
+        histogram = {5: 10, 10: 8, 60: 2}
+
+        self.assertEqual(get_percentile(histogram, 0.5), 5)
+        self.assertEqual(get_percentile(histogram, 0.95), 60)
+        self.assertIsNone(get_percentile({}, 0.5))
+
+
+class TransitionOrderTest(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(name='Ресторан')
+        self.order = create_order(registered_at=timezone.now() - timedelta(minutes=7))
+
+    def test_order_walks_the_whole_way(self):
+        transition_order(self.order.id, 'CK', restaurant_id=self.restaurant.id)
+        transition_order(self.order.id, 'DL')
+        order = transition_order(self.order.id, 'CP')
+
+        self.assertEqual(order.status, 'CP')
+        self.assertIsNotNone(order.called_at)
+        self.assertIsNotNone(order.delivered_at)
+        self.assertEqual(
+            list(order.events.values_list('from_status', 'to_status', 'restaurant_id')),
+            [
+                ('NP', 'CK', self.restaurant.id),
+                ('CK', 'DL', self.restaurant.id),
+                ('DL', 'CP', self.restaurant.id),
+            ],
+        )
+        self.assertEqual(
+            sorted(OrderSlaBucket.objects.values_list('metric', 'upper_minutes', 'orders_count')),
+            [('call', 10, 1), ('delivery', 10, 1)],
+        )
+
+    def test_steps_cannot_be_skipped_or_repeated(self):
+        with self.assertRaises(InvalidTransition):
+            transition_order(self.order.id, 'DL', restaurant_id=self.restaurant.id)
+        transition_order(self.order.id, 'CK', restaurant_id=self.restaurant.id)
+        with self.assertRaises(InvalidTransition):
+            transition_order(self.order.id, 'CK')
+
+        self.assertEqual(self.order.events.count(), 1)
+
+    def test_kitchen_needs_a_restaurant(self):
+        with self.assertRaises(InvalidTransition):
+            transition_order(self.order.id, 'CK')
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'NP')
+        self.assertFalse(self.order.events.exists())
+
+    def test_histograms_give_percentiles_per_restaurant(self):
+        for minutes in [3, 4, 8, 50]:
+            order = create_order(registered_at=timezone.now() - timedelta(minutes=minutes))
+            transition_order(order.id, 'CK', restaurant_id=self.restaurant.id)
+
+        self.assertEqual(get_sla_percentiles(), {self.restaurant.id: {'call': (5, 60)}})
+        self.assertEqual(get_sla_percentiles(restaurant_ids=[]), {})
+
+    def test_old_hours_are_left_out(self):
+        OrderSlaBucket.objects.create(
+            restaurant=self.restaurant,
+            hour=timezone.now() - timedelta(days=2),
+            metric='call',
+            upper_minutes=5,
+            orders_count=3,
+        )
+
+        self.assertEqual(get_sla_percentiles(hours=24), {})
+        self.assertEqual(get_sla_percentiles(hours=72), {self.restaurant.id: {'call': (5, 5)}})
+
+    def test_api_reports_invalid_transition(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+        response = self.client.post(
+            f'/api/orders/{self.order.id}/transition/',
+            {'status': 'CK', 'restaurant': self.restaurant.id},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'CK')
+
+        response = self.client.post(
+            f'/api/orders/{self.order.id}/transition/',
+            {'status': 'CP'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json())
@@ -0,0 +1,136 @@
+import bisect
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Order, OrderEvent, OrderSlaBucket
+
+
+TRANSITIONS = {
+    'NP': 'CK',
+    'CK': 'DL',
+    'DL': 'CP',
+}
+
+# Histogram bucket upper bounds in minutes; anything slower lands in the overflow bucket.
+SLA_BUCKETS = [5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 360, 720, 1440]
+SLA_OVERFLOW = 2 ** 31 - 1
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def get_sla_bucket(duration):
+    minutes = duration.total_seconds() / 60
+    index = bisect.bisect_left(SLA_BUCKETS, minutes)
+    return SLA_BUCKETS[index] if index < len(SLA_BUCKETS) else SLA_OVERFLOW
+
+
+def record_sla(restaurant_id, metric, duration, at):
+    hour = at.replace(minute=0, second=0, microsecond=0)
+    bucket = {
+        'restaurant_id': restaurant_id,
+        'hour': hour,
+        'metric': metric,
+        'upper_minutes': get_sla_bucket(duration),
+    }
+    if OrderSlaBucket.objects.filter(**bucket).update(orders_count=F('orders_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            OrderSlaBucket.objects.create(orders_count=1, **bucket)
+    except IntegrityError:
+        # Someone else created the bucket first.
+        OrderSlaBucket.objects.filter(**bucket).update(orders_count=F('orders_count') + 1)
+
+
+@transaction.atomic
+def transition_order(order_id, status, restaurant_id=None):
+    """Move the order one step along NP → CK → DL → CP.
+
+    Stamps called_at when the order goes to the kitchen and delivered_at
+    when it is completed, appends an OrderEvent and counts the step in the
+    restaurant's SLA histogram for the current hour.
+    """
+    order = Order.objects.select_for_update().get(pk=order_id)
+    if TRANSITIONS.get(order.status) != status:
+        raise InvalidTransition(
+            f'Заказ {order.id} нельзя перевести из статуса «{order.get_status_display()}» '
+            f'в «{dict(Order.statuses).get(status, status)}»'
+        )
+
+    now = timezone.now()
+    previous_status = order.status
+    update_fields = ['status', 'updated_at']
+    if restaurant_id is not None:
+        order.cooking_restaurant_id = restaurant_id
+        update_fields.append('cooking_restaurant')
+    if order.cooking_restaurant_id is None:
+        raise InvalidTransition(f'Заказу {order.id} не назначен ресторан')
+
+    order.status = status
+    if status == 'CK':
+        order.called_at = now
+        update_fields.append('called_at')
+    elif status == 'CP':
+        order.delivered_at = now
+        update_fields.append('delivered_at')
+    order.save(update_fields=update_fields)
+
+    OrderEvent.objects.create(
+        order=order,
+        from_status=previous_status,
+        to_status=status,
+        restaurant_id=order.cooking_restaurant_id,
+        created_at=now,
+    )
+    if status == 'CK':
+        record_sla(order.cooking_restaurant_id, 'call', now - order.registered_at, now)
+    elif status == 'CP':
+        record_sla(order.cooking_restaurant_id, 'delivery', now - order.registered_at, now)
+    return order
+
+
+def get_percentile(histogram, share):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for upper_minutes in sorted(histogram):
+        seen += histogram[upper_minutes]
+        if seen >= share * total:
+            return upper_minutes
+
+
+def get_sla_percentiles(hours=24, restaurant_ids=None):
+    """Return {restaurant_id: {metric: (p50, p95)}} in minutes over the last `hours` hours.
+
+    Percentiles are bucket upper bounds, SLA_OVERFLOW means "over a day".
+    Only the per-hour histograms are read, never the orders themselves.
+    """
+    since = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    buckets = OrderSlaBucket.objects.filter(hour__gte=since)
+    if restaurant_ids is not None:
+        buckets = buckets.filter(restaurant_id__in=restaurant_ids)
+
+    histograms = defaultdict(lambda: defaultdict(dict))
+    rows = (
+        buckets
+        .values_list('restaurant_id', 'metric', 'upper_minutes')
+        .annotate(orders=Sum('orders_count'))
+        .order_by()
+    )
+    for restaurant_id, metric, upper_minutes, orders in rows:
+        histograms[restaurant_id][metric][upper_minutes] = orders
+
+    return {
+        restaurant_id: {
+            metric: (get_percentile(histogram, 0.5), get_percentile(histogram, 0.95))
+            for metric, histogram in metrics.items()
+        }
+        for restaurant_id, metrics in histograms.items()
+    }
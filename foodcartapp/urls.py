@@ -1,6 +1,17 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from .views import (
+    product_list_api,
+    banners_list_api,
+    register_order,
+    dispatch_orders_api,
+    order_split_plan_api,
+    order_transition_api,
+    kitchen_queue_api,
+    menu_availability_api,
+    menu_import_api,
+    order_export_api,
+)
 
 
 app_name = "foodcartapp"
@@ -9,4 +20,11 @@ urlpatterns = [
     path('products/', product_list_api),
     path('banners/', banners_list_api),
     path('order/', register_order),
+    path('dispatch/', dispatch_orders_api),
+    path('orders/export/', order_export_api),
+    path('orders/<int:order_id>/split-plan/', order_split_plan_api),
+    path('orders/<int:order_id>/transition/', order_transition_api),
+    path('restaurants/<int:restaurant_id>/kitchen/', kitchen_queue_api),
+    path('menu/availability/', menu_availability_api),
+    path('menu/import/', menu_import_api),
 ]
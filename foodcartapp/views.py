@@ -1,20 +1,40 @@
-import json
-from django.http import JsonResponse
+import functools
+import io
+from pathlib import Path
+
+from django import forms
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.templatetags.static import static
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
 from rest_framework.serializers import Serializer, ModelSerializer, ValidationError
-from rest_framework.serializers import CharField
+from rest_framework.serializers import BooleanField, CharField, ChoiceField, FileField, IntegerField, ListField, PrimaryKeyRelatedField
 
 from rest_framework.renderers import JSONRenderer
 
-from .models import Product, Order, OrderProduct
+from .catalog import get_catalog_snapshot
+from .dispatch import dispatch_orders
+from .export import CONTENT_TYPES, FORMATS as EXPORT_FORMATS, export_orders, get_export_orders
+from .kitchen import get_kitchen_snapshot, get_kitchen_version
+from .menu import get_menu_item_batches, set_menu_availability
+from .menu_import import FORMATS, MenuImportError, import_menu, read_rows
+from .split import plan_split_order
+from .transitions import InvalidTransition, transition_order
+from .models import Order, OrderProduct, Product, Restaurant, RestaurantMenuItem
+from .payloads import make_json_payload, payload_response
+from .tasks import enqueue_order_geocoding
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 
 
 
 class OrderProductSerializer(ModelSerializer):
+    # Products are looked up for the whole cart at once in OrderSerializer.validate_products
+    product = IntegerField(source='product_id', min_value=1)
+
     class Meta:
         model = OrderProduct
         fields = ['product', 'quantity']
@@ -27,10 +47,36 @@ class OrderSerializer(ModelSerializer):
         model = Order
         fields = ['firstname', 'lastname', 'phonenumber', 'address', 'products']
 
+    def validate_products(self, products):
+        available_menu_items = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)
+        found_products = (
+            Product.objects
+            .annotate(is_available=Exists(available_menu_items))
+            .in_bulk({item['product_id'] for item in products})
+        )
 
-def banners_list_api(request):
+        errors = []
+        for item in products:
+            product = found_products.get(item['product_id'])
+            if not product:
+                errors.append({'product': [f'Товара с id {item["product_id"]} не существует']})
+            elif not product.is_available:
+                errors.append({'product': [f'Товар «{product.name}» сейчас не продаётся']})
+            else:
+                errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
+
+        return [
+            {'product': found_products[item['product_id']], 'quantity': item['quantity']}
+            for item in products
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def get_banners_payload():
     # FIXME move data to db?
-    return JsonResponse([
+    return make_json_payload([
         {
             'title': 'Burger',
             'src': static('burger.jpg'),
@@ -46,38 +92,48 @@ def banners_list_api(request):
             'src': static('tasty.jpg'),
             'text': 'Food is incomplete without a tasty dessert',
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    ])
+
+
+def banners_list_api(request):
+    return payload_response(request, get_banners_payload())
 
 
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = list()
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return payload_response(request, get_catalog_snapshot())
+
+
+def kitchen_queue_api(request, restaurant_id):
+    """Orders the restaurant is cooking; answers 304 from the cache alone while nothing changed."""
+    if not request.user.is_staff:
+        return JsonResponse({'detail': 'Нужен вход под учётной записью менеджера'}, status=403)
+    version = get_kitchen_version(restaurant_id)
+    if request.GET.get('since') == str(version):
+        return HttpResponseNotModified()
+    return payload_response(request, get_kitchen_snapshot(restaurant_id, version))
+
+
+class OrderExportForm(forms.Form):
+    format = forms.ChoiceField(choices=[(name, name) for name in EXPORT_FORMATS], required=False)
+    registered_after = forms.DateTimeField(required=False)
+    registered_before = forms.DateTimeField(required=False)
+
+
+def order_export_api(request):
+    """Stream orders with their lines as CSV (default) or NDJSON, optionally for a registration period."""
+    if not request.user.is_staff:
+        return JsonResponse({'detail': 'Нужен вход под учётной записью менеджера'}, status=403)
+    form = OrderExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse(form.errors, status=400)
+    file_format = form.cleaned_data['format'] or 'csv'
+    orders = get_export_orders(
+        registered_after=form.cleaned_data['registered_after'],
+        registered_before=form.cleaned_data['registered_before'],
+    )
+    response = StreamingHttpResponse(export_orders(orders, file_format), content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="orders.{file_format}"'
+    return response
 
 
 @transaction.atomic
@@ -90,7 +146,11 @@ def register_order(request):
         firstname=serializer.validated_data['firstname'],
         lastname=serializer.validated_data['lastname'],
         phonenumber=serializer.validated_data['phonenumber'],
-        address=serializer.validated_data['address']
+        address=serializer.validated_data['address'],
+        total_cost=sum(
+            product['product'].price * product['quantity']
+            for product in serializer.validated_data['products']
+        ),
     )
     products = [
         OrderProduct(
@@ -101,5 +161,133 @@ def register_order(request):
         )
         for product in serializer.validated_data['products']]
     OrderProduct.objects.bulk_create(products)
+    transaction.on_commit(lambda: enqueue_order_geocoding(order.id))
     response = JSONRenderer().render(OrderSerializer(order).data)
     return Response(response)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def dispatch_orders_api(request):
+    assignments = dispatch_orders(dry_run=bool(request.data.get('dry_run')))
+    return Response({
+        'assigned': len(assignments),
+        'total_distance_km': round(sum(km for _, _, km in assignments), 3),
+        'assignments': [
+            {'order': order_id, 'restaurant': restaurant_id, 'distance_km': km}
+            for order_id, restaurant_id, km in assignments
+        ],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def order_split_plan_api(request, order_id):
+    order = get_object_or_404(Order, pk=order_id)
+    product_ids = order.products.values_list('product_id', flat=True)
+    plan = plan_split_order(product_ids, order.latitude, order.longitude)
+    return Response({
+        'order': order.id,
+        'plan': plan and [
+            {'restaurant': restaurant_id, 'distance_km': round(km, 3), 'products': plan_product_ids}
+            for restaurant_id, km, plan_product_ids in plan
+        ],
+    })
+
+
+class OrderTransitionSerializer(Serializer):
+    status = ChoiceField(choices=Order.statuses)
+    restaurant = PrimaryKeyRelatedField(queryset=Restaurant.objects.all(), required=False)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def order_transition_api(request, order_id):
+    get_object_or_404(Order, pk=order_id)
+    serializer = OrderTransitionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    restaurant = serializer.validated_data.get('restaurant')
+    try:
+        order = transition_order(
+            order_id,
+            serializer.validated_data['status'],
+            restaurant_id=restaurant and restaurant.id,
+        )
+    except InvalidTransition as error:
+        raise ValidationError({'status': [str(error)]})
+    return Response({
+        'order': order.id,
+        'status': order.status,
+        'restaurant': order.cooking_restaurant_id,
+        'called_at': order.called_at,
+        'delivered_at': order.delivered_at,
+    })
+
+
+class MenuAvailabilitySerializer(Serializer):
+    available = BooleanField()
+    items = ListField(child=ListField(child=IntegerField(min_value=1), min_length=2, max_length=2), required=False)
+    restaurants = ListField(child=IntegerField(min_value=1), required=False)
+    products = ListField(child=IntegerField(min_value=1), required=False)
+
+    def validate(self, data):
+        if 'items' in data and ('restaurants' in data or 'products' in data):
+            raise ValidationError('Укажите либо items, либо restaurants и products')
+        if 'items' not in data and not ('restaurants' in data and 'products' in data):
+            raise ValidationError('Укажите items или restaurants вместе с products')
+        return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def menu_availability_api(request):
+    """Put many menu items on or off sale at once.
+
+    Either `items` as [[restaurant_id, product_id], ...] or every pair of
+    `restaurants` × `products`.
+    """
+    serializer = MenuAvailabilitySerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    if 'items' in data:
+        menu_item_batches = get_menu_item_batches(data['items'])
+    else:
+        menu_item_batches = [RestaurantMenuItem.objects.filter(
+            restaurant_id__in=data['restaurants'],
+            product_id__in=data['products'],
+        )]
+    return Response({'updated': set_menu_availability(menu_item_batches, data['available'])})
+
+
+class MenuImportSerializer(Serializer):
+    file = FileField()
+    format = ChoiceField(choices=FORMATS, required=False)
+
+    def validate(self, data):
+        if 'format' not in data:
+            data['format'] = Path(data['file'].name).suffix.lstrip('.').lower()
+            if data['format'] not in FORMATS:
+                raise ValidationError(f'Не удалось определить формат файла, укажите format: {", ".join(FORMATS)}')
+        return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def menu_import_api(request):
+    """Upsert products and restaurant menus from an uploaded CSV or NDJSON file, see menu_import.import_menu."""
+    serializer = MenuImportSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.validated_data['file']
+    # Large uploads are already on disk, the file is read line by line.
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        stats = import_menu(read_rows(lines, serializer.validated_data['format']))
+    except MenuImportError as error:
+        raise ValidationError({'file': str(error)})
+    finally:
+        lines.detach()
+    stats['error_samples'] = [
+        {'line': line_number, 'message': message}
+        for line_number, message in stats['error_samples']
+    ]
+    return Response(stats)
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from star_burger.settings import yandex_api_key
+
+
+def make_response(coordinates):
+    """Build a payload shaped like the Yandex geocoder answer; `coordinates` is (lon, lat) or None."""
+    feature_members = []
+    if coordinates:
+        lon, lat = coordinates
+        feature_members.append({
+            'GeoObject': {
+                'Point': {'pos': f'{lon} {lat}'},
+            },
+        })
+    return {
+        'response': {
+            'GeoObjectCollection': {
+                'featureMember': feature_members,
+            },
+        },
+    }
+
+
+class BaseGeocoder:
+    name = None
+
+    def geocode(self, address):
+        """Return the raw geocoder payload for the address."""
+        raise NotImplementedError
+
+    def fetch_coordinates(self, address):
+        found_places = self.geocode(address)['response']['GeoObjectCollection']['featureMember']
+
+        if not found_places:
+            return None
+
+        most_relevant = found_places[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
+        return lon, lat
+
+
+class YandexGeocoder(BaseGeocoder):
+    name = 'yandex'
+
+    def __init__(self, apikey=yandex_api_key, base_url=None, timeout=None):
+        self.apikey = apikey
+        self.base_url = base_url or settings.GEOCODER_URL
+        self.timeout = timeout or settings.GEOCODER_TIMEOUT
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.GEOCODER_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def geocode(self, address):
+        response = self.session.get(self.base_url, params={
+            "geocode": address,
+            "apikey": self.apikey,
+            "format": "json",
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+class LocalGeocoder(BaseGeocoder):
+    """Offline stand-in for load tests and benchmarks.
+
+    Addresses listed in the GEOCODER_FIXTURES JSON file ({"address": [lon, lat]})
+    resolve to their coordinates, unknown ones are not found. Without fixtures
+    every address gets stable synthetic coordinates around Moscow.
+    """
+    name = 'local'
+
+    def __init__(self, fixtures_path=None, latency=None):
+        fixtures_path = fixtures_path or settings.GEOCODER_FIXTURES
+        self.fixtures = None
+        if fixtures_path:
+            with open(fixtures_path, encoding='utf-8') as fixtures_file:
+                self.fixtures = json.load(fixtures_file)
+        self.latency = settings.GEOCODER_LOCAL_LATENCY if latency is None else latency
+
+    def get_synthetic_coordinates(self, address):
+        digest = hashlib.sha1(address.encode()).digest()
+        lon = 37.35 + int.from_bytes(digest[:4], 'big') / 2 ** 32 * 0.5
+        lat = 55.55 + int.from_bytes(digest[4:8], 'big') / 2 ** 32 * 0.4
+        return f'{lon:.6f}', f'{lat:.6f}'
+
+    def geocode(self, address):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fixtures is None:
+            return make_response(self.get_synthetic_coordinates(address))
+        return make_response(self.fixtures.get(address))
@@ -0,0 +1,181 @@
+import hashlib
+import re
+import threading
+import time
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Place
+
+
+class RateLimiter:
+    """Spaces out calls so that no more than `rate` happen per second in this process."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_call_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            call_at = max(self.next_call_at, now)
+            self.next_call_at = call_at + self.interval
+        time.sleep(call_at - now)
+
+
+class GeocoderUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling a provider for `cooldown` seconds after `threshold` failures in a row."""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            # Half-open: let a single call through to probe the provider.
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+circuit_breakers = {}
+circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider):
+    with circuit_breakers_lock:
+        if provider not in circuit_breakers:
+            circuit_breakers[provider] = CircuitBreaker(
+                settings.GEOCODER_FAILURE_THRESHOLD,
+                settings.GEOCODER_COOLDOWN,
+            )
+        return circuit_breakers[provider]
+
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    with rate_limiters_lock:
+        if provider not in rate_limiters:
+            rate_limiters[provider] = RateLimiter(settings.GEOCODER_RATE_LIMIT)
+        return rate_limiters[provider]
+
+
+def set_rate_limit(rate, provider=None):
+    with rate_limiters_lock:
+        rate_limiters[provider or get_geocoder().name] = RateLimiter(rate)
+
+
+geocoder = None
+geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    global geocoder
+    with geocoder_lock:
+        if geocoder is None:
+            geocoder = import_string(settings.GEOCODER_BACKEND)()
+        return geocoder
+
+
+def normalize_address(address):
+    """Return the Place key of the address.
+
+    Normalization adds a space after punctuation, so the key may outgrow
+    the address it came from; keys longer than Place.address allows are
+    cut and end with a hash of the whole normalized address instead.
+    """
+    address = address.lower().replace('ё', 'е')
+    address = re.sub(r'\s*([,.;])\s*', r'\1 ', address)
+    address = ' '.join(address.split()).strip(' ,.;')
+    max_length = Place._meta.get_field('address').max_length
+    if len(address) <= max_length:
+        return address
+    digest = hashlib.sha1(address.encode()).hexdigest()
+    return f'{address[:max_length - len(digest) - 1]} {digest}'
+
+
+def fetch_coordinates(address):
+    backend = get_geocoder()
+    circuit_breaker = get_circuit_breaker(backend.name)
+    if not circuit_breaker.allow():
+        raise GeocoderUnavailable(f'Геокодер {backend.name} временно отключён')
+
+    get_rate_limiter(backend.name).wait()
+    try:
+        coordinates = backend.fetch_coordinates(address)
+    except (requests.RequestException, KeyError, ValueError) as error:
+        circuit_breaker.record_failure()
+        raise GeocoderUnavailable(f'Геокодер {backend.name} не ответил') from error
+    circuit_breaker.record_success()
+    return coordinates
+
+
+def get_cached_coordinates(addresses):
+    """Return {normalized address: (lon, lat) or None if not found} for fresh cache entries."""
+    normalized_addresses = {normalize_address(address) for address in addresses}
+    places = Place.objects.filter(address__in=normalized_addresses)
+    return {
+        place.address: (place.longitude, place.latitude) if place.is_found() else None
+        for place in places
+        if not place.is_expired()
+    }
+
+
+def save_coordinates(address, coordinates):
+    """Cache the geocoder answer; `None` is cached too, for a shorter time."""
+    lon = lat = None
+    if coordinates:
+        lon, lat = (Decimal(coordinate) for coordinate in coordinates)
+    Place.objects.update_or_create(
+        address=normalize_address(address),
+        defaults={
+            'longitude': lon,
+            'latitude': lat,
+            'fetched_at': timezone.now(),
+        }
+    )
+    if not coordinates:
+        return None
+    return lon, lat
+
+
+def get_coordinates(address):
+    """Return (lon, lat) for the address or None if it can't be found.
+
+    The geocoder is asked only on a cache miss. Raises GeocoderUnavailable
+    when it fails or is switched off by the circuit breaker.
+    """
+    cached_coordinates = get_cached_coordinates([address])
+    if cached_coordinates:
+        return cached_coordinates[normalize_address(address)]
+
+    return save_coordinates(address, fetch_coordinates(address))
@@ -0,0 +1,51 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+
+from places.backends import LocalGeocoder
+
+
+class GeocoderRequestHandler(BaseHTTPRequestHandler):
+    geocoder = None
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        address = query.get('geocode', [''])[0]
+        body = json.dumps(self.geocoder.geocode(address), ensure_ascii=False).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальный геокодер с ответами в формате Яндекса. '
+        'Чтобы сайт ходил в него, укажите GEOCODER_URL=http://<host>:<port>/1.x'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8081)
+        parser.add_argument('--fixtures', help='JSON-файл вида {"адрес": [lon, lat]}')
+        parser.add_argument('--latency', type=float, help='Искусственная задержка ответа, секунд')
+
+    def handle(self, *args, host, port, fixtures, latency, **options):
+        handler = type('Handler', (GeocoderRequestHandler,), {
+            'geocoder': LocalGeocoder(fixtures_path=fixtures, latency=latency),
+        })
+        server = ThreadingHTTPServer((host, port), handler)
+        self.stdout.write(f'Геокодер слушает http://{host}:{port}/1.x')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
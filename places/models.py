@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Place(models.Model):
+    address = models.CharField(
+        'адрес',
+        max_length=100,
+        unique=True
+    )
+    latitude = models.DecimalField(
+        'широта',
+        max_digits=8,
+        decimal_places=6,
+        blank=True,
+        null=True
+    )
+    longitude = models.DecimalField(
+        'долгота',
+        max_digits=8,
+        decimal_places=6,
+        blank=True,
+        null=True
+    )
+    fetched_at = models.DateTimeField(
+        'дата запроса к геокодеру',
+        default=timezone.now,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'место'
+        verbose_name_plural = 'места'
+
+    def __str__(self):
+        return self.address
+
+    def is_found(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def is_expired(self):
+        ttl = settings.GEOCODER_CACHE_TTL if self.is_found() else settings.GEOCODER_NEGATIVE_CACHE_TTL
+        return timezone.now() - self.fetched_at > ttl
@@ -0,0 +1,163 @@
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import geocoder
+from .backends import LocalGeocoder, YandexGeocoder
+from .geocoder import (
+    CircuitBreaker,
+    GeocoderUnavailable,
+    get_cached_coordinates,
+    get_coordinates,
+    get_geocoder,
+    normalize_address,
+)
+from .management.commands.run_local_geocoder import GeocoderRequestHandler
+from .models import Place
+
+
+class NormalizeAddressTest(TestCase):
+    def test_spelling_variants_share_a_key(self):
+        self.assertEqual(
+            normalize_address('  Москва,ул. Тёплая ,д.1 '),
+            normalize_address('москва, ул.  теплая, д. 1'),
+        )
+
+    def test_long_key_fits_place_address(self):
+        # 100 characters fit Order.address, but gain a space after every comma.
+        address = 'Москва,' * 14 + 'д1'
+        max_length = Place._meta.get_field('address').max_length
+
+        key = normalize_address(address)
+
+        self.assertEqual(len(address), 100)
+        self.assertLessEqual(len(key), max_length)
+        self.assertNotEqual(key, normalize_address('Москва,' * 14 + 'д2'))
+
+    def test_long_address_is_cached(self):
+        address = 'Москва,' * 14 + 'д1'
+        with mock.patch('places.geocoder.fetch_coordinates', return_value=('37.6', '55.7')) as fetch:
+            self.assertEqual(get_coordinates(address), (Decimal('37.6'), Decimal('55.7')))
+            self.assertEqual(get_coordinates(address), (Decimal('37.6'), Decimal('55.7')))
+
+        fetch.assert_called_once_with(address)
+        self.assertIn(normalize_address(address), get_cached_coordinates([address]))
+
+
+class LocalGeocoderTest(SimpleTestCase):
+    def test_fixtures_resolve_listed_addresses_only(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8') as fixtures_file:
+            json.dump({'Москва, Тверская, 1': [37.61, 55.76]}, fixtures_file, ensure_ascii=False)
+            fixtures_file.flush()
+            backend = LocalGeocoder(fixtures_path=fixtures_file.name, latency=0)
+
+        self.assertEqual(backend.fetch_coordinates('Москва, Тверская, 1'), ('37.61', '55.76'))
+        self.assertIsNone(backend.fetch_coordinates('Москва, Арбат, 1'))
+
+    @override_settings(GEOCODER_FIXTURES=None)
+    def test_synthetic_coordinates_are_stable(self):
+        backend = LocalGeocoder(latency=0)
+
+        coordinates = backend.fetch_coordinates('Москва, Тверская, 1')
+
+        self.assertEqual(coordinates, LocalGeocoder(latency=0).fetch_coordinates('Москва, Тверская, 1'))
+        self.assertNotEqual(coordinates, backend.fetch_coordinates('Москва, Арбат, 1'))
+        lon, lat = map(float, coordinates)
+        self.assertTrue(37.35 <= lon <= 37.85 and 55.55 <= lat <= 55.95)
+
+    def test_yandex_backend_talks_to_the_local_server(self):
+        handler = type('Handler', (GeocoderRequestHandler,), {
+            'geocoder': LocalGeocoder(latency=0),
+        })
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+
+        backend = YandexGeocoder(apikey='key', base_url=f'http://{host}:{port}/1.x')
+
+        self.assertEqual(
+            backend.fetch_coordinates('Москва, Тверская, 1'),
+            LocalGeocoder(latency=0).fetch_coordinates('Москва, Тверская, 1'),
+        )
+
+    @override_settings(GEOCODER_BACKEND='places.backends.LocalGeocoder')
+    def test_backend_comes_from_settings(self):
+        with mock.patch.object(geocoder, 'geocoder', None):
+            self.assertIsInstance(get_geocoder(), LocalGeocoder)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def test_opens_after_failures_in_a_row_and_probes_after_cooldown(self):
+        circuit_breaker = CircuitBreaker(threshold=2, cooldown=60)
+        with mock.patch('places.geocoder.time.monotonic', return_value=1000):
+            circuit_breaker.record_failure()
+            self.assertTrue(circuit_breaker.allow())
+            circuit_breaker.record_failure()
+            self.assertFalse(circuit_breaker.allow())
+
+        with mock.patch('places.geocoder.time.monotonic', return_value=1061):
+            # One probe after the cooldown, then closed again until it answers.
+            self.assertTrue(circuit_breaker.allow())
+            self.assertFalse(circuit_breaker.allow())
+            circuit_breaker.record_success()
+            self.assertTrue(circuit_breaker.allow())
+
+
+@override_settings(GEOCODER_FAILURE_THRESHOLD=2, GEOCODER_COOLDOWN=60, GEOCODER_RATE_LIMIT=0)
+class GetCoordinatesTest(TestCase):
+    address = 'Москва, Тверская, 1'
+
+    def setUp(self):
+        self.backend = mock.Mock(spec=YandexGeocoder)
+        self.backend.name = 'test'
+        for patcher in [
+            mock.patch.object(geocoder, 'geocoder', self.backend),
+            mock.patch.object(geocoder, 'circuit_breakers', {}),
+            mock.patch.object(geocoder, 'rate_limiters', {}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_failing_geocoder_is_switched_off(self):
+        self.backend.fetch_coordinates.side_effect = requests.ConnectionError
+
+        for _ in range(3):
+            with self.assertRaises(GeocoderUnavailable):
+                get_coordinates(self.address)
+
+        self.assertEqual(self.backend.fetch_coordinates.call_count, 2)
+        # Failures are not cached: the address is asked again once the geocoder is back.
+        self.assertFalse(Place.objects.exists())
+
+    def test_not_found_address_is_cached(self):
+        self.backend.fetch_coordinates.return_value = None
+
+        self.assertIsNone(get_coordinates(self.address))
+        self.assertIsNone(get_coordinates(self.address))
+
+        self.backend.fetch_coordinates.assert_called_once_with(self.address)
+
+    @override_settings(GEOCODER_NEGATIVE_CACHE_TTL=timedelta(hours=1))
+    def test_not_found_address_is_asked_again_sooner(self):
+        self.backend.fetch_coordinates.return_value = None
+        get_coordinates(self.address)
+        Place.objects.update(fetched_at=timezone.now() - timedelta(hours=2))
+        self.backend.fetch_coordinates.return_value = ('37.61', '55.76')
+
+        self.assertEqual(get_coordinates(self.address), (Decimal('37.61'), Decimal('55.76')))
+        self.assertEqual(self.backend.fetch_coordinates.call_count, 2)
+
+        # A found address stays cached for much longer.
+        Place.objects.update(fetched_at=timezone.now() - timedelta(hours=2))
+        get_coordinates(self.address)
+        self.assertEqual(self.backend.fetch_coordinates.call_count, 2)
@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+ORDERS_ORDERING = ['-status', 'registered_at', 'id']
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order):
+    position = [order.status, order.registered_at.isoformat(), order.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        status, registered_at, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(status), datetime.fromisoformat(registered_at), int(order_id)
+    except (ValueError, TypeError) as error:
+        raise InvalidCursor(cursor) from error
+
+
+def paginate_orders(orders, cursor=None, page_size=50):
+    """Return one page of orders in ORDERS_ORDERING after `cursor` and the cursor of the next page.
+
+    The page is found with a keyset condition instead of OFFSET, so the cost
+    of a page doesn't depend on how deep into the backlog it is.
+    """
+    orders = orders.order_by(*ORDERS_ORDERING)
+    if cursor:
+        status, registered_at, order_id = decode_cursor(cursor)
+        orders = orders.filter(
+            Q(status__lt=status)
+            | Q(status=status, registered_at__gt=registered_at)
+            | Q(status=status, registered_at=registered_at, id__gt=order_id)
+        )
+
+    page = list(orders[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(page[-1])
+    return page, next_cursor
@@ -1,3 +1,124 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from foodcartapp.feed import get_feed_cursor
+from foodcartapp.models import Order, Product, Restaurant, RestaurantMenuItem
+from foodcartapp.tests.helpers import FoodcartTestCase, create_order
+
+from .pagination import paginate_orders
+
+
+class ManagerTestCase(FoodcartTestCase):
+    def setUp(self):
+        super().setUp()
+        manager = User.objects.create_user('manager', password='secret', is_staff=True)
+        self.client.force_login(manager)
+
+
+class PaginateOrdersTest(FoodcartTestCase):
+    def test_pages_follow_status_then_registration(self):
+        now = timezone.now()
+        orders = [
+            create_order(status='CK', registered_at=now - timedelta(minutes=1)),
+            create_order(status='NP', registered_at=now - timedelta(minutes=2)),
+            create_order(status='NP', registered_at=now - timedelta(minutes=3)),
+            create_order(status='DL', registered_at=now - timedelta(minutes=4)),
+        ]
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = paginate_orders(Order.objects.all(), cursor=cursor, page_size=3)
+            pages.append([order.id for order in page])
+            if not cursor:
+                break
+
+        self.assertEqual(pages, [[orders[2].id, orders[1].id, orders[3].id], [orders[0].id]])
+
+
+@override_settings(ORDERS_PAGE_SIZE=10)
+class ViewOrdersTest(ManagerTestCase):
+    def test_query_count_does_not_grow_with_backlog(self):
+        for _ in range(5):
+            create_order(latitude=55.7, longitude=37.6)
+        # Warm up the cached load counters and restaurant grid.
+        self.client.get(reverse('restaurateur:view_orders'))
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('restaurateur:view_orders'))
+        for _ in range(30):
+            create_order(latitude=55.7, longitude=37.6)
+
+        with self.assertNumQueries(len(small.captured_queries)):
+            response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual(len(response.context['order_items']), 10)
+
+    def test_order_without_coordinates_is_left_to_background_geocoder(self):
+        order = create_order()
+
+        with mock.patch('places.geocoder.fetch_coordinates') as fetch:
+            response = self.client.get(reverse('restaurateur:view_orders'))
+
+        self.assertContains(response, 'Координаты уточняются')
+        self.enqueue_order_geocoding.assert_called_once_with(order.id)
+        fetch.assert_not_called()
+        self.assertIsNone(Order.objects.get(pk=order.pk).latitude)
+
+
+class ViewOrdersFeedTest(ManagerTestCase):
+    def get_feed(self, **params):
+        response = self.client.get(reverse('restaurateur:view_orders_feed'), {'timeout': 0, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_orders_no_longer_matching_filters_are_removed(self):
+        kept_order, cooked_order = create_order(), create_order()
+        response = self.client.get(reverse('restaurateur:view_orders'), {'status': 'NP'})
+        cursor = response.context['feed_cursor']
+
+        cooked_order.status = 'CK'
+        cooked_order.save()
+        kept_order.comment = 'Без лука'
+        kept_order.save()
+        feed = self.get_feed(status='NP', cursor=cursor)
+
+        changes = {order['id']: order for order in feed['orders']}
+        self.assertFalse(changes[cooked_order.id]['matches'])
+        self.assertNotIn('html', changes[cooked_order.id])
+        self.assertTrue(changes[kept_order.id]['matches'])
+        self.assertIn('Без лука', changes[kept_order.id]['html'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('restaurateur:view_orders_feed'), {'timeout': 0, 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_timeout_must_be_finite(self):
+        for timeout in ['nan', 'inf', '-inf']:
+            with self.subTest(timeout=timeout):
+                response = self.client.get(reverse('restaurateur:view_orders_feed'), {
+                    'timeout': timeout,
+                    'cursor': get_feed_cursor(),
+                })
+                self.assertEqual(response.status_code, 400)
+
+
+class ViewProductsTest(ManagerTestCase):
+    def test_page_shows_availability_table(self):
+        restaurant = Restaurant.objects.create(name='Ресторан')
+        product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        self.client.get(reverse('restaurateur:ProductsView'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('restaurateur:ProductsView'))
+
+        # The table comes from the cache; only the session and the user are read.
+        self.assertFalse([query for query in queries if 'foodcartapp_' in query['sql']])
+
+        self.assertContains(response, 'Чизбургер')
+        self.assertEqual(response.context['products_with_restaurant_availability'][0][1], [True])
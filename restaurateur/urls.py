@@ -14,6 +14,7 @@ urlpatterns = [
 
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders/feed/', views.view_orders_feed, name="view_orders_feed"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
@@ -1,5 +1,12 @@
+import math
+from collections import defaultdict
+
 from django import forms
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
@@ -8,12 +15,17 @@ from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
 from environs import Env
-import requests
-from geopy import distance
 
 
-from foodcartapp.models import Product, Restaurant, Order, RestaurantMenuItem
-from star_burger.settings import yandex_api_key
+from foodcartapp.feed import decode_feed_cursor, get_feed_cursor, wait_for_changed_orders
+from foodcartapp.load import get_restaurant_loads
+from foodcartapp.menu_table import get_menu_table
+from foodcartapp.models import Restaurant, Order, OrderCandidate, OrderProduct
+from foodcartapp.split import plan_split_order
+from foodcartapp.tasks import enqueue_order_geocoding
+from foodcartapp.transitions import SLA_OVERFLOW, get_sla_percentiles
+
+from .pagination import InvalidCursor, decode_cursor, paginate_orders
 
 env = Env()
 env.read_env()
@@ -36,6 +48,59 @@ class Login(forms.Form):
     )
 
 
+class OrderFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус', required=False,
+        choices=[('', 'Все незавершённые')] + Order.statuses,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан', required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Любой',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    payment_method = forms.ChoiceField(
+        label='Способ оплаты', required=False,
+        choices=[('', 'Любой')] + Order.payment_methods,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    registered_after = forms.DateTimeField(
+        label='Зарегистрирован с', required=False,
+        widget=forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'})
+    )
+    registered_before = forms.DateTimeField(
+        label='по', required=False,
+        widget=forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'})
+    )
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except InvalidCursor:
+                raise forms.ValidationError('Неверная ссылка на страницу')
+        return cursor
+
+    def filter(self, orders):
+        filters = self.cleaned_data
+        if filters['status']:
+            orders = orders.filter(status=filters['status'])
+        else:
+            orders = orders.exclude(status='CP')
+        if filters['restaurant']:
+            orders = orders.filter(cooking_restaurant=filters['restaurant'])
+        if filters['payment_method']:
+            orders = orders.filter(payment_method=filters['payment_method'])
+        if filters['registered_after']:
+            orders = orders.filter(registered_at__gte=filters['registered_after'])
+        if filters['registered_before']:
+            orders = orders.filter(registered_at__lt=filters['registered_before'])
+        return orders
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
@@ -73,87 +138,193 @@ def is_manager(user):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-
-    products_with_restaurant_availability = []
-    for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
-
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
-        )
-
+    restaurants, products_with_restaurant_availability = get_menu_table()
     return render(request, template_name="products_list.html", context={
         'products_with_restaurant_availability': products_with_restaurant_availability,
         'restaurants': restaurants,
     })
 
 
+def format_sla(p50, p95):
+    if p50 is None:
+        return 'нет данных'
+
+    def format_minutes(minutes):
+        return 'больше суток' if minutes == SLA_OVERFLOW else f'≤ {minutes} мин'
+
+    return f'медиана {format_minutes(p50)}, 95% {format_minutes(p95)}'
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
+    restaurants = list(Restaurant.objects.all())
+    loads = get_restaurant_loads([restaurant.id for restaurant in restaurants])
+    sla = get_sla_percentiles(hours=24)
+    for restaurant in restaurants:
+        restaurant.load = loads[restaurant.id]
+        restaurant.sla = {
+            metric: format_sla(*sla.get(restaurant.id, {}).get(metric, (None, None)))
+            for metric in ['call', 'delivery']
+        }
     return render(request, template_name="restaurants_list.html", context={
-        'restaurants': Restaurant.objects.all(),
+        'restaurants': restaurants,
     })
 
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+def attach_restaurant_candidates(orders):
+    """Set `restaurant_distances` on each order from its materialized candidates.
 
-    if not found_places:
-        return None
-
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lon, lat
+    Orders without coordinates are shown as pending and left to the
+    background geocoder; the feed brings them back once they are geocoded.
+    """
+    for order in orders:
+        order.coordinates_pending = order.latitude is None
+        if order.coordinates_pending and order.status == 'NP':
+            # In case the order did not fit the geocoder queue when it came in.
+            enqueue_order_geocoding(order.id)
+
+    loads = get_restaurant_loads({
+        candidate.restaurant_id
+        for order in orders
+        for candidate in order.ranked_candidates
+    })
+    for order in orders:
+        order.restaurant_distances = [
+            {
+                'restaurant': candidate.restaurant.name,
+                'distance': candidate.distance_km,
+                'cooking': loads[candidate.restaurant_id]['CK'],
+                'delivering': loads[candidate.restaurant_id]['DL'],
+            }
+            for candidate in order.ranked_candidates
+        ]
+    attach_split_plans([
+        order for order in orders
+        if order.status == 'NP' and not order.coordinates_pending and not order.restaurant_distances
+    ])
+
+
+def attach_split_plans(orders):
+    """Set `split_plan` on orders no single restaurant can cook: which restaurants cook which products."""
+    if not orders:
+        return
+    order_products = defaultdict(dict)
+    for order_id, product_id, product_name in (
+        OrderProduct.objects
+        .filter(order__in=orders)
+        .values_list('order_id', 'product_id', 'product__name')
+    ):
+        order_products[order_id][product_id] = product_name
+
+    plans = {
+        order.id: plan_split_order(order_products[order.id], order.latitude, order.longitude)
+        for order in orders
+    }
+    restaurants = Restaurant.objects.in_bulk({
+        restaurant_id
+        for plan in plans.values() if plan
+        for restaurant_id, _, _ in plan
+    })
+    for order in orders:
+        order.split_plan = [
+            {
+                'restaurant': restaurants[restaurant_id].name,
+                'distance': round(km, 3),
+                'products': [order_products[order.id][product_id] for product_id in product_ids],
+            }
+            for restaurant_id, km, product_ids in plans[order.id] or []
+        ]
 
 
-def return_distance(restuarant_dict):
-    return restuarant_dict['distance']
+def get_candidates_prefetch():
+    return Prefetch(
+        'candidates',
+        queryset=OrderCandidate.objects.select_related('restaurant').order_by('rank'),
+        to_attr='ranked_candidates',
+    )
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = Order.objects.get_total_cost().exclude(status='CP').order_by("-status").prefetch_related('products')
-    all_restaurants = Restaurant.objects.all()
-    restaurants_menu = RestaurantMenuItem.objects.all()\
-        .values("restaurant", "product", "availability")
-    for order in orders:
-        if not order.latitude:
-            order.longitude, order.latitude = fetch_coordinates(yandex_api_key, order.address)
-        order_products = [product.product.id for product in order.products.all()]
-        unavailable_restaurants = [
-            item for item in restaurants_menu
-            if item["product"] in order_products and not item["availability"]
-        ]
+    order_filter = OrderFilter(request.GET)
+    if not order_filter.is_valid():
+        return render(request, template_name='order_items.html', context={
+            'order_filter': order_filter,
+            'order_items': [],
+        }, status=400)
+
+    feed_cursor = get_feed_cursor()
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
+    orders, next_cursor = paginate_orders(
+        order_filter.filter(Order.objects.prefetch_related(get_candidates_prefetch())),
+        cursor=order_filter.cleaned_data['cursor'],
+        page_size=settings.ORDERS_PAGE_SIZE,
+    )
+    attach_restaurant_candidates(orders)
+
+    next_page_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_page_query = params.urlencode()
+
+    return render(request, template_name='order_items.html', context={
+        'order_filter': order_filter,
+        'order_items': orders,
+        'next_page_query': next_page_query,
+        'is_first_page': not order_filter.cleaned_data['cursor'],
+        'feed_cursor': feed_cursor,
+        'filter_query': filter_params.urlencode(),
+    })
 
-        available_restaurants = [
-            restaurant for restaurant in all_restaurants
-            if restaurant.id not in unavailable_restaurants
-        ]
 
-        order.restaurants = available_restaurants
-        order.restaurant_distances = sorted([
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_feed(request):
+    """Orders changed after `cursor`; those no longer matching the page filters come without html, to be removed."""
+    filter_params = request.GET.copy()
+    feed_cursor = filter_params.pop('cursor', [None])[-1]
+    order_filter = OrderFilter(filter_params)
+    try:
+        timeout = float(request.GET.get('timeout', settings.ORDER_FEED_TIMEOUT))
+        # nan passes min() and max() and would never time out.
+        if not math.isfinite(timeout):
+            raise ValueError(timeout)
+        timeout = min(timeout, settings.ORDER_FEED_TIMEOUT)
+        decode_feed_cursor(feed_cursor or '')
+    except ValueError:
+        return JsonResponse({'error': 'Нужны корректные параметры cursor и timeout'}, status=400)
+    if not order_filter.is_valid():
+        return JsonResponse({'error': order_filter.errors}, status=400)
+
+    orders, cursor = wait_for_changed_orders(
+        Order.objects.prefetch_related(get_candidates_prefetch()),
+        cursor=feed_cursor,
+        limit=settings.ORDERS_PAGE_SIZE,
+        timeout=max(timeout, 0),
+    )
+    matching_ids = set(
+        order_filter
+        .filter(Order.objects.filter(id__in=[order.id for order in orders]))
+        .values_list('id', flat=True)
+    )
+    attach_restaurant_candidates([order for order in orders if order.id in matching_ids])
+
+    return JsonResponse({
+        'cursor': cursor,
+        'orders': [
             {
-                'restaurant': restaurant.name,
-                'distance': round(
-                    distance.distance(
-                        (order.latitude, order.longitude),
-                        (restaurant.latitude, restaurant.longitude)
-                    ).km, 3
-                )
+                'id': order.id,
+                'status': order.status,
+                'matches': True,
+                'restaurant_distances': order.restaurant_distances,
+                'split_plan': getattr(order, 'split_plan', []),
+                'html': render_to_string('order_row.html', {'order': order}),
+            } if order.id in matching_ids else {
+                'id': order.id,
+                'status': order.status,
+                'matches': False,
             }
-            for restaurant in available_restaurants
-        ], key=return_distance)
-
-    return render(request, template_name='order_items.html', context={
-        'order_items': orders
+            for order in orders
+        ],
     })
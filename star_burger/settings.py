@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 import dj_database_url
 
@@ -20,6 +21,7 @@ ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 INSTALLED_APPS = [
     'foodcartapp.apps.FoodcartappConfig',
     'restaurateur.apps.RestaurateurConfig',
+    'places.apps.PlacesConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -98,6 +100,35 @@ MEDIA_URL = '/media/'
 
 yandex_api_key = env("API_KEY")
 
+GEOCODER_BACKEND = env('GEOCODER_BACKEND', 'places.backends.YandexGeocoder')
+GEOCODER_URL = env('GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 2)
+GEOCODER_FIXTURES = env('GEOCODER_FIXTURES', None)
+GEOCODER_LOCAL_LATENCY = env.float('GEOCODER_LOCAL_LATENCY', 0)
+GEOCODER_CACHE_TTL = timedelta(days=env.int('GEOCODER_CACHE_TTL_DAYS', 30))
+GEOCODER_NEGATIVE_CACHE_TTL = timedelta(hours=env.int('GEOCODER_NEGATIVE_CACHE_TTL_HOURS', 24))
+GEOCODER_FAILURE_THRESHOLD = env.int('GEOCODER_FAILURE_THRESHOLD', 3)
+GEOCODER_COOLDOWN = env.float('GEOCODER_COOLDOWN', 60)
+GEOCODER_RATE_LIMIT = env.float('GEOCODER_RATE_LIMIT', 10)
+GEOCODER_WORKERS = env.int('GEOCODER_WORKERS', 4)
+GEOCODER_QUEUE_SIZE = env.int('GEOCODER_QUEUE_SIZE', 1000)
+
+RESTAURANT_GRID_CELL_DEGREES = env.float('RESTAURANT_GRID_CELL_DEGREES', 0.05)
+NEAREST_RESTAURANTS_COUNT = env.int('NEAREST_RESTAURANTS_COUNT', 5)
+ORDERS_PAGE_SIZE = env.int('ORDERS_PAGE_SIZE', 50)
+ORDER_FEED_TIMEOUT = env.float('ORDER_FEED_TIMEOUT', 25)
+ORDER_FEED_LOOKBACK = env.float('ORDER_FEED_LOOKBACK', 30)
+RESTAURANT_CAPACITY = env.int('RESTAURANT_CAPACITY', 10)
+DISPATCH_CANDIDATES = env.int('DISPATCH_CANDIDATES', 20)
+
+CACHES = {
+    # Processes learn about each other's changes through this cache, so
+    # outside DEBUG it has to be set explicitly, see `check --deploy`.
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://') if DEBUG else env.dj_cache_url('CACHE_URL'),
+}
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', 24 * 60 * 60)
+KITCHEN_CACHE_TIMEOUT = env.int('KITCHEN_CACHE_TIMEOUT', 60 * 60)
+
 DATABASES = {
     'default': dj_database_url.parse(
         env("DATABASE_URL"),